@@ -0,0 +1,208 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from pipeline import Pipeline, Stage
+from resource_manager import ResourceManager
+
+# --- CẤU HÌNH ---
+MODEL_PATH = 'runs/detect/yolov26_trained/weights/best.pt'
+MODEL_BACKEND = "onnx"
+IMAGE_DIR = 'Image_Test'
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]   # giống app.py
+ENHANCERS = ["sci", "lut"]
+LUT_PATH = 'SCI/CVPR/weights/medium_lut.npz'
+NIGHT = True                     # ép chế độ đêm (chạy SCI) để đo trường hợp nặng nhất
+CAMERA_FPS = 30.0                # giải mã JPEG giả lập thread đọc camera
+STREAM_FPS = 15.0                # encode MJPEG như 1 client đang xem stream
+STREAM_QUALITY = 80
+WARMUP_ITER = 3
+DURATION = 15.0                  # giây đo cho mỗi cấu hình
+CV2_THREADS = [1, 2]
+# số thread của YOLO (ONNX Runtime intra-op, hoặc torch nếu backend torch):
+# 1, đúng số lõi "infer" (mặc định của app.py) và cả máy (mặc định của thư viện)
+
+
+def list_images(folder):
+    exts = ('*.jpg', '*.JPG', '*.jpeg', '*.png')
+    return sorted(p for e in exts for p in glob.glob(os.path.join(folder, e)))
+
+
+def make_configs():
+    """
+    Các cách chia lõi cần thử: YOLO lấy n lõi cuối, lõi 0 cho camera / encode,
+    phần còn lại cho tiền xử lý (SCI). Cấu hình đầu = không ghim (như cũ).
+    Mỗi cách chia đo thêm số thread của YOLO (xem ghi chú ở CẤU HÌNH).
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    configs = [{"label": "không ghim", "plan": {}, "torch": None, "cv2": None, "ort": None}]
+    if len(cpus) < 2:
+        print(f"⚠️ Chỉ có {len(cpus)} lõi khả dụng -> chỉ đo cấu hình không ghim")
+        return configs
+
+    io = cpus[:1]
+    for n_infer in range(1, len(cpus)):
+        infer = cpus[-n_infer:]
+        pre = cpus[1:len(cpus) - n_infer] or io
+        plan = {"camera": io, "capture": io, "encode": io,
+                "preprocess": pre, "store": pre, "infer": infer}
+        for yolo_threads in sorted({1, n_infer, len(cpus)}):
+            # None = mặc định của ResourceManager (torch của backend onnx: số lõi "preprocess")
+            torch_threads = yolo_threads if MODEL_BACKEND == "torch" else None
+            ort_threads = yolo_threads if MODEL_BACKEND == "onnx" else None
+            for cv2_threads in CV2_THREADS:
+                configs.append({
+                    "label": f"io {io} / pre {pre} / infer {infer}",
+                    "plan": plan, "torch": torch_threads, "cv2": cv2_threads, "ort": ort_threads
+                })
+    return configs
+
+
+# ================= 1 CẤU HÌNH (process con) =================
+
+def run_config(cfg):
+    """
+    Chạy cấu hình trong process riêng: affinity / số thread / pool thread của
+    ONNX Runtime và OpenMP không đặt lại được sau khi đã tạo.
+    """
+    res = ResourceManager(plan=cfg["plan"], torch_threads=cfg["torch"], cv2_threads=cfg["cv2"],
+                          ort_threads=cfg["ort"])
+    res.apply_threads()
+
+    # thread chính load model -> pool thread của backend nằm trên lõi "infer"
+    res.pin("infer")
+    from model_backend import load_model, set_ort_threads
+    from pre_processor_image import Tienxulyanh
+    from yoloxx import Yolo_AI
+
+    model, backend = load_model(MODEL_PATH, MODEL_BACKEND)
+    if backend == "onnx" and res.ort_threads:
+        set_ort_threads(model, res.ort_threads)
+    pre = Tienxulyanh(rect=True, enhance_mode="letterbox", enhancers=ENHANCERS, lut_path=LUT_PATH,
+                      enhance_threshold=1.0 if NIGHT else 0.0)
+    ai = Yolo_AI(model, class_names=['bus', 'car', 'motorbike', 'truck'], backend=backend)
+    res.apply_threads(backend=backend)
+
+    jpegs = [open(p, 'rb').read() for p in list_images(IMAGE_DIR)]
+    frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+    for _ in range(WARMUP_ITER):
+        ready, b, meta = pre.process_with_meta(frames[0], ROI_BOX, reuse=False)
+        ai.infer(ready, b, meta=meta)
+
+    latest = {"frame": frames[0]}
+    running = True
+    counters = {"camera": 0, "encode": 0}
+
+    def camera_loop():
+        res.pin("camera")
+        i = 0
+        while running:
+            t0 = time.perf_counter()
+            latest["frame"] = cv2.imdecode(np.frombuffer(jpegs[i % len(jpegs)], np.uint8), cv2.IMREAD_COLOR)
+            counters["camera"] += 1
+            i += 1
+            time.sleep(max(0.0, 1.0 / CAMERA_FPS - (time.perf_counter() - t0)))
+
+    def encode_loop():
+        res.pin("encode")
+        while running:
+            t0 = time.perf_counter()
+            cv2.imencode('.jpg', latest["frame"], [cv2.IMWRITE_JPEG_QUALITY, STREAM_QUALITY])
+            counters["encode"] += 1
+            time.sleep(max(0.0, 1.0 / STREAM_FPS - (time.perf_counter() - t0)))
+
+    def preprocess(frame):
+        return pre.process_with_meta(frame, ROI_BOX, reuse=False)
+
+    def infer(item):
+        ready, b, meta = item
+        return ai.infer(ready, b, meta=meta)
+
+    done = []
+    pipe = Pipeline([Stage("preprocess", preprocess), Stage("infer", infer),
+                     Stage("store", lambda det: det)],
+                    source=lambda: latest["frame"], source_fps=CAMERA_FPS,
+                    sink=done.append, thread_init=res.pin)
+
+    threads = [threading.Thread(target=camera_loop, daemon=True, name="camera"),
+               threading.Thread(target=encode_loop, daemon=True, name="encode")]
+    for t in threads:
+        t.start()
+    pipe.start()
+    time.sleep(DURATION)
+    running = False
+    pipe.stop()
+
+    stats = pipe.stats()
+    return {
+        "det_fps": len(done) / DURATION,
+        "camera_fps": counters["camera"] / DURATION,
+        "encode_fps": counters["encode"] / DURATION,
+        "preprocess_ms": stats["preprocess"]["avg_ms"],
+        "infer_ms": stats["infer"]["avg_ms"],
+        "bottleneck": stats["bottleneck"],
+        "backend": backend,
+        "torch_threads": res.stats()["torch_threads"],
+        "ort_threads": res.ort_threads
+    }
+
+
+# ================= SWEEP =================
+
+def sweep():
+    configs = make_configs()
+    print(f"Đo {len(configs)} cấu hình, mỗi cấu hình {DURATION:.0f}s "
+          f"({'đêm / SCI' if NIGHT else 'ngày'}, backend {MODEL_BACKEND})...")
+
+    rows = []
+    for i, cfg in enumerate(configs, 1):
+        name = f"{cfg['label']}, torch={cfg['torch']}, ort={cfg['ort']}, cv2={cfg['cv2']}"
+        print(f"[{i}/{len(configs)}] {name}")
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), json.dumps(cfg)],
+                              capture_output=True, text=True)
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if line is None:
+            print(f"   ❌ Lỗi: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        rows.append((cfg, json.loads(line[len("RESULT "):])))
+
+    if not rows:
+        return
+
+    rows.sort(key=lambda r: r[1]["det_fps"], reverse=True)
+    print("\n" + "="*117)
+    print(f"CHIA LÕI CPU ({len(rows)} cấu hình, sắp xếp theo FPS detect; None = mặc định thư viện)")
+    print("-" * 117)
+    print(f"{'Cấu hình':<46}{'torch':>6}{'ort':>5}{'cv2':>5}{'Detect FPS':>12}{'Cam FPS':>9}{'Enc FPS':>9}"
+          f"{'Pre (ms)':>10}{'YOLO (ms)':>11}{'Chậm nhất':>14}")
+    for cfg, r in rows:
+        print(f"{cfg['label']:<46}{str(r['torch_threads']):>6}{str(r['ort_threads']):>5}{str(cfg['cv2']):>5}"
+              f"{r['det_fps']:>12.2f}{r['camera_fps']:>9.1f}{r['encode_fps']:>9.1f}{r['preprocess_ms']:>10.1f}"
+              f"{r['infer_ms']:>11.1f}{r['bottleneck']:>14}")
+    print("="*117)
+
+    best, _ = rows[0]
+    plan = dict(best["plan"])
+    if plan:
+        plan["multi"] = plan["infer"]
+    print("Dùng trong app.py:")
+    print(f"CPU_PLAN = {plan}")
+    # None = để ResourceManager tự tính theo CPU_PLAN + backend
+    print(f"TORCH_THREADS = {best['torch']}")
+    print(f"ORT_THREADS = {best['ort']}")
+    print(f"CV2_THREADS = {best['cv2']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print("RESULT " + json.dumps(run_config(json.loads(sys.argv[1]))))
+    else:
+        sweep()
@@ -0,0 +1,87 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from model_backend import BACKENDS, load_model
+from pre_processor_image import Tienxulyanh
+
+# --- CẤU HÌNH ---
+MODEL_PATH = 'runs/detect/yolov26_trained/weights/best.pt'
+IMAGE_DIR = 'Image_Test'
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]   # giống app.py
+IMG_SIZE = 640
+CONF = 0.5
+WARMUP_ITER = 3
+
+
+def list_images(folder):
+    exts = ('*.jpg', '*.JPG', '*.jpeg', '*.png')
+    return sorted(p for e in exts for p in glob.glob(os.path.join(folder, e)))
+
+
+def run_backend(model, frames):
+    # trả về (số xe theo class từng ảnh, thời gian từng ảnh ms)
+    for _ in range(WARMUP_ITER):
+        model(frames[0], conf=CONF, imgsz=IMG_SIZE, verbose=False)
+
+    counts, times = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        result = model(frame, conf=CONF, imgsz=IMG_SIZE, verbose=False)[0]
+        times.append((time.perf_counter() - start) * 1000.0)
+
+        cls = result.boxes.cls.cpu().numpy().astype(int) if result.boxes is not None else np.zeros(0, int)
+        counts.append(np.bincount(cls, minlength=len(result.names)))
+    return counts, times
+
+
+def parity_check(backends):
+    pre = Tienxulyanh(rect=True, enhancers=[])
+    frames = []
+    for path in list_images(IMAGE_DIR):
+        img = cv2.imread(path)
+        if img is not None:
+            # giống vòng detect nền: ROI + letterbox chữ nhật, không tăng sáng
+            frames.append(pre.process(img, roi_box=ROI_BOX)[0])
+
+    if not frames:
+        print(f"Không có ảnh trong {IMAGE_DIR}")
+        return
+
+    results = {}
+    for backend in backends:
+        try:
+            model, _ = load_model(MODEL_PATH, backend, imgsz=IMG_SIZE, fallback=False)
+        except Exception as e:
+            print(f"Bỏ qua {backend}: {e}")
+            continue
+        results[backend] = run_backend(model, frames)
+
+    ref_name = "torch" if "torch" in results else next(iter(results), None)
+    if ref_name is None:
+        return
+    ref_counts, _ = results[ref_name]
+
+    print("\n" + "="*70)
+    print(f"SO SÁNH BACKEND ({len(frames)} ảnh {IMAGE_DIR}, imgsz={IMG_SIZE}, conf={CONF})")
+    print(f"Số xe so với {ref_name}: ảnh khác số xe theo class / chênh tổng số xe")
+    print("-" * 70)
+    print(f"{'Backend':<10}{'TB (ms)':>10}{'Max (ms)':>10}{'Tổng xe':>10}{'Ảnh lệch':>12}{'Chênh tổng':>14}")
+    for backend, (counts, times) in results.items():
+        mismatched = sum(
+            int(not np.array_equal(c[:len(r)], r[:len(c)])) for c, r in zip(counts, ref_counts)
+        )
+        total_diff = sum(abs(int(c.sum()) - int(r.sum())) for c, r in zip(counts, ref_counts))
+        print(f"{backend:<10}{np.mean(times):>10.1f}{np.max(times):>10.1f}"
+              f"{int(sum(c.sum() for c in counts)):>10d}{mismatched:>12d}{total_diff:>14d}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    # python Rasp_backend.py torch onnx -> chỉ so các backend được liệt kê
+    parity_check(sys.argv[1:] or list(BACKENDS))
@@ -0,0 +1,78 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from pre_processor_image import Tienxulyanh
+
+# --- CẤU HÌNH ---
+IMAGE_DIR = 'Image_Test'
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]   # giống app.py
+STEPS = [1, 2, 4, 8]             # bước lấy mẫu của chế độ "fast"
+ENHANCE_THRESHOLD = 0.4          # enhance_threshold của Tienxulyanh.process
+TEST_ITER = 50                   # số lần đo / ảnh
+
+
+def crop_roi(frame, roi_box):
+    h, w = frame.shape[:2]
+    y1, y2, x1, x2 = roi_box
+    return frame[int(h*y1):int(h*y2), int(w*x1):int(w*x2)]
+
+
+def measure(pre, roi):
+    # trả về (giá trị, thời gian TB ms)
+    value = pre._calculate_brightness(roi)
+    start = time.perf_counter()
+    for _ in range(TEST_ITER):
+        pre._calculate_brightness(roi)
+    return value, (time.perf_counter() - start) * 1000.0 / TEST_ITER
+
+
+def benchmark_brightness():
+    paths = sorted(glob.glob(os.path.join(IMAGE_DIR, '*.jpg')) + glob.glob(os.path.join(IMAGE_DIR, '*.JPG')))
+    if not paths:
+        print(f"Không có ảnh trong {IMAGE_DIR}")
+        return
+
+    ref = Tienxulyanh(use_sci=False, brightness_mode="hsv")
+    fast = {s: Tienxulyanh(use_sci=False, brightness_mode="fast", brightness_step=s) for s in STEPS}
+
+    hsv_ms = []
+    fast_ms = {s: [] for s in STEPS}
+    fast_err = {s: [] for s in STEPS}
+    flips = {s: 0 for s in STEPS}
+
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        roi = crop_roi(frame, ROI_BOX)
+
+        v_ref, t_ref = measure(ref, roi)
+        hsv_ms.append(t_ref)
+
+        for s in STEPS:
+            v, t = measure(fast[s], roi)
+            fast_ms[s].append(t)
+            fast_err[s].append(abs(v - v_ref))
+            # quyết định ngày / đêm (bật SCI) có bị đổi không
+            if (v < ENHANCE_THRESHOLD) != (v_ref < ENHANCE_THRESHOLD):
+                flips[s] += 1
+
+    print("\n" + "="*60)
+    print(f"BENCHMARK ĐỘ SÁNG ({len(hsv_ms)} ảnh trong {IMAGE_DIR}, ROI {ROI_BOX})")
+    print("-" * 60)
+    print(f"{'Chế độ':<14}{'TB (ms)':>10}{'Sai số TB':>12}{'Sai số max':>12}{'Đổi SCI':>10}")
+    print(f"{'hsv':<14}{np.mean(hsv_ms):>10.3f}{0:>12.4f}{0:>12.4f}{0:>10d}")
+    for s in STEPS:
+        print(f"{'fast step=' + str(s):<14}{np.mean(fast_ms[s]):>10.3f}"
+              f"{np.mean(fast_err[s]):>12.4f}{np.max(fast_err[s]):>12.4f}{flips[s]:>10d}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    benchmark_brightness()
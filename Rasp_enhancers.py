@@ -0,0 +1,97 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from enhancers import build_enhancers
+from pre_processor_image import Tienxulyanh
+
+# --- CẤU HÌNH ---
+MODEL_PATH = 'runs/detect/yolov26_trained/weights/best.pt'
+IMAGE_DIR = 'Image_Test'
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]   # giống app.py
+LUT_PATH = 'SCI/CVPR/weights/medium_lut.npz'
+# (tên hiển thị, tên enhancer, tham số build_enhancers)
+CONFIGS = [
+    ("none", "none", {}),
+    ("sci", "sci", {}),
+    ("sci lowres 0.5", "sci", {"sci_lowres": True, "sci_scale": 0.5}),
+    ("lut", "lut", {"lut_path": LUT_PATH}),
+    ("zerodce x1", "zerodce", {"dce_scale": 1}),
+    ("zerodce x4", "zerodce", {"dce_scale": 4}),
+    ("zerodce x12", "zerodce", {"dce_scale": 12}),
+]
+# giả lập ảnh đêm bằng cách làm tối ảnh test (1.0 = ảnh gốc)
+DARKEN = [1.0, 0.3]
+CONF = 0.5
+TEST_ITER = 5
+
+
+def list_images(folder):
+    exts = ('*.jpg', '*.JPG', '*.jpeg', '*.png')
+    return sorted(p for e in exts for p in glob.glob(os.path.join(folder, e)))
+
+
+def benchmark_enhancers():
+    model = YOLO(MODEL_PATH)
+    pre = Tienxulyanh(rect=True, enhancers=[])
+
+    enhancers = {}
+    for label, name, kwargs in CONFIGS:
+        built = build_enhancers([name], **kwargs)
+        if name in built:
+            enhancers[label] = built[name]
+
+    frames = []
+    for path in list_images(IMAGE_DIR):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        y1, y2, x1, x2 = ROI_BOX
+        roi = img[int(h*y1):int(h*y2), int(w*x1):int(w*x2)]
+        # tăng sáng trên ảnh cỡ YOLO như enhance_mode="letterbox"
+        canvas, _, _ = pre.letterbox_into(roi, reuse=False)
+        frames.append(canvas)
+
+    if not frames:
+        print(f"Không có ảnh trong {IMAGE_DIR}")
+        return
+
+    for factor in DARKEN:
+        inputs = [f if factor == 1.0 else cv2.convertScaleAbs(f, alpha=factor) for f in frames]
+        counts = {}
+        times = {}
+
+        for label, enhancer in enhancers.items():
+            counts[label] = []
+            times[label] = []
+            for img in inputs:
+                b = pre._calculate_brightness(img)
+                start = time.perf_counter()
+                for _ in range(TEST_ITER):
+                    out = enhancer.apply(img, b)
+                times[label].append((time.perf_counter() - start) * 1000.0 / TEST_ITER)
+
+                result = model(out, conf=CONF, verbose=False)[0]
+                counts[label].append(len(result.boxes) if result.boxes is not None else 0)
+
+        ref = counts.get("sci")
+        print("\n" + "="*72)
+        print(f"SO SÁNH BỘ TĂNG SÁNG ({len(inputs)} ảnh {IMAGE_DIR}, làm tối x{factor}, YOLO conf={CONF})")
+        print("-" * 72)
+        print(f"{'Bộ tăng sáng':<18}{'TB (ms)':>10}{'Max (ms)':>10}{'Tổng xe':>10}{'Lệch / ảnh so với sci':>24}")
+        for label in enhancers:
+            diff = np.mean(np.abs(np.array(counts[label]) - np.array(ref))) if ref else float('nan')
+            print(f"{label:<18}{np.mean(times[label]):>10.2f}{np.max(times[label]):>10.2f}"
+                  f"{sum(counts[label]):>10d}{diff:>24.2f}")
+        print("="*72)
+
+
+if __name__ == "__main__":
+    benchmark_enhancers()
@@ -0,0 +1,207 @@
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import yaml
+from ultralytics import YOLO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from model_backend import ensure_export
+
+# --- CẤU HÌNH ---
+MODEL_PATH = 'runs/detect/yolov26_trained/weights/best.pt'
+INT8_PATH = 'runs/detect/yolov26_trained/weights/best_int8.onnx'
+DATASET_DIR = 'train/vehicle dataset'
+CALIB_DIR = os.path.join(DATASET_DIR, 'valid', 'images')
+IMG_SIZE = 640
+CALIB_IMAGES = 200               # số ảnh valid dùng để calibrate (lấy ngẫu nhiên)
+VAL_IMAGES = 0                   # số ảnh valid còn lại (không calibrate) để đo mAP, 0 = tất cả
+CALIB_METHOD = "MinMax"          # MinMax / Entropy / Percentile
+PER_CHANNEL = True
+SEED = 0
+
+
+def list_images(folder):
+    exts = ('*.jpg', '*.JPG', '*.jpeg', '*.png')
+    return sorted(p for e in exts for p in glob.glob(os.path.join(folder, e)))
+
+
+# ================= CALIBRATION =================
+
+def letterbox_square(img, size):
+    # giống LetterBox của Ultralytics cho model kích thước cố định (pad 114 thành vuông)
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    canvas = np.full((size, size, 3), 114, np.uint8)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas
+
+
+def make_reader(input_name, paths):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ValidImageReader(CalibrationDataReader):
+        # ảnh valid -> tensor (1, 3, S, S) RGB float [0, 1] như đầu vào YOLO
+        def __init__(self):
+            self.paths = iter(paths)
+
+        def get_next(self):
+            for path in self.paths:
+                img = cv2.imread(path)
+                if img is None:
+                    continue
+                img = letterbox_square(img, IMG_SIZE)[:, :, ::-1]
+                tensor = np.ascontiguousarray(img.transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+                return {input_name: tensor}
+            return None
+
+    return ValidImageReader()
+
+
+def split_images():
+    """
+    Chia ảnh valid thành 2 phần rời nhau: ảnh calibrate và ảnh đo mAP
+    (đo trên chính ảnh đã calibrate làm ΔmAP của INT8 trông tốt hơn thực tế).
+    """
+    paths = list_images(CALIB_DIR)
+    if len(paths) < 2:
+        raise RuntimeError(f"Cần ít nhất 2 ảnh trong {CALIB_DIR} (calibrate + val)")
+    random.Random(SEED).shuffle(paths)
+
+    n_calib = min(CALIB_IMAGES, len(paths) // 2)
+    calib, val = paths[:n_calib], sorted(paths[n_calib:])
+    if VAL_IMAGES > 0:
+        val = val[:VAL_IMAGES]
+    return calib, val
+
+
+def quantize(fp32_path, paths):
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    # tối ưu đồ thị + suy shape trước khi quantize (khuyến nghị của onnxruntime);
+    # model export dynamic -> bỏ bước suy shape symbolic (không suy được hết)
+    prep_path = os.path.join(tempfile.mkdtemp(), "prep.onnx")
+    quant_pre_process(fp32_path, prep_path, skip_symbolic_shape=True)
+
+    print(f"Calibrate INT8 trên {len(paths)} ảnh {CALIB_DIR} ({CALIB_METHOD})...")
+    t0 = time.perf_counter()
+    quantize_static(
+        prep_path, INT8_PATH, make_reader(input_name, paths),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=PER_CHANNEL,
+        calibrate_method=getattr(CalibrationMethod, CALIB_METHOD)
+    )
+    print(f"Đã lưu {INT8_PATH} sau {time.perf_counter() - t0:.0f}s")
+
+
+# ================= VALIDATION =================
+
+def link_file(src, dst):
+    try:
+        os.symlink(os.path.abspath(src), dst)
+    except (OSError, NotImplementedError):
+        # Windows không có quyền tạo symlink -> copy
+        shutil.copy2(src, dst)
+
+
+def make_val_dir(val_paths, tmp):
+    """
+    Bản tạm của tập val (link từng ảnh + nhãn): Ultralytics ghi labels.cache cạnh
+    thư mục labels, làm vậy để không ghi đè valid/labels.cache của dataset.
+    """
+    image_dir = os.path.join(tmp, 'valid', 'images')
+    label_dir = os.path.join(tmp, 'valid', 'labels')
+    os.makedirs(image_dir)
+    os.makedirs(label_dir)
+
+    src_labels = os.path.join(DATASET_DIR, 'valid', 'labels')
+    for path in val_paths:
+        name = os.path.basename(path)
+        link_file(path, os.path.join(image_dir, name))
+        label = os.path.splitext(name)[0] + '.txt'
+        if os.path.exists(os.path.join(src_labels, label)):
+            link_file(os.path.join(src_labels, label), os.path.join(label_dir, label))
+    return image_dir
+
+
+def make_data_yaml(model_names, val_paths):
+    """
+    data.yaml của dataset dùng đường dẫn Windows -> viết bản tạm trỏ vào bản
+    tạm của tập val (chỉ các ảnh không dùng để calibrate).
+    """
+    with open(os.path.join(DATASET_DIR, 'data.yaml'), encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+
+    names = data.get('names')
+    if names is not None and len(names) != len(model_names):
+        print(f"⚠️ Dataset có {len(names)} class {names} nhưng model có {len(model_names)} class "
+              f"-> mAP chỉ có ý nghĩa khi model được train trên dataset này")
+
+    tmp = tempfile.mkdtemp()
+    val = make_val_dir(val_paths, tmp)
+
+    out = {'path': tmp, 'train': val, 'val': val, 'names': names}
+    path = os.path.join(tmp, 'data.yaml')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(out, f, allow_unicode=True)
+    return path
+
+
+def validate(model_path, data_yaml):
+    model = YOLO(model_path, task="detect")
+    metrics = model.val(data=data_yaml, imgsz=IMG_SIZE, batch=1, device="cpu",
+                        plots=False, verbose=False)
+    return {
+        "map50": float(metrics.box.map50),
+        "map": float(metrics.box.map),
+        "ms": float(metrics.speed.get("inference", 0.0)),
+        "size_mb": file_size_mb(model_path)
+    }
+
+
+def file_size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, '*'))) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def run_quantization():
+    calib_paths, val_paths = split_images()
+    fp32_path = ensure_export(MODEL_PATH, "onnx", imgsz=IMG_SIZE)
+    quantize(fp32_path, calib_paths)
+
+    data_yaml = make_data_yaml(YOLO(MODEL_PATH).names, val_paths)
+    rows = {}
+    for name, path in (("torch fp32", MODEL_PATH), ("onnx fp32", fp32_path), ("onnx int8", INT8_PATH)):
+        print(f"Đang val {name} ({path})...")
+        rows[name] = validate(path, data_yaml)
+
+    base = rows["onnx fp32"]
+    print("\n" + "="*76)
+    print(f"INT8 vs FP32 ({len(val_paths)} ảnh {CALIB_DIR} ngoài {len(calib_paths)} ảnh calibrate, imgsz={IMG_SIZE})")
+    print("-" * 76)
+    print(f"{'Model':<12}{'mAP50':>9}{'mAP50-95':>10}{'ΔmAP50-95':>11}{'Infer (ms)':>12}{'Tăng tốc':>10}{'Size (MB)':>11}")
+    for name, r in rows.items():
+        speedup = base["ms"] / r["ms"] if r["ms"] > 0 else float('nan')
+        print(f"{name:<12}{r['map50']:>9.4f}{r['map']:>10.4f}{r['map'] - base['map']:>+11.4f}"
+              f"{r['ms']:>12.1f}{speedup:>9.2f}x{r['size_mb']:>11.1f}")
+    print("="*76)
+    print(f"Dùng INT8 trong app.py: MODEL_PATH = \"{INT8_PATH}\", MODEL_BACKEND = \"onnx\"")
+
+
+if __name__ == "__main__":
+    run_quantization()
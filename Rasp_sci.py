@@ -0,0 +1,149 @@
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from pre_processor_image import Tienxulyanh
+
+# --- CẤU HÌNH ---
+IMAGE_DIR = 'Image_Test'
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]   # giống app.py
+TARGET_SIZE = (640, 640)
+RECT = True
+# (tên, enhance_mode, sci_scale) - "roi" là cách cũ, dùng làm ảnh chuẩn
+MODES = [
+    ("roi", "roi", 1.0),
+    ("letterbox", "letterbox", 1.0),
+    ("lowres 0.5", "lowres", 0.5),
+    ("lowres 0.25", "lowres", 0.25),
+    ("lowres 0.125", "lowres", 0.125),
+]
+WARMUP_ITER = 2
+TEST_ITER = 5
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(pre, frame):
+    # enhance_threshold > 1 -> luôn ở chế độ đêm (luôn chạy SCI)
+    out, _, _ = pre.process_with_meta(frame, roi_box=ROI_BOX, reuse=False)
+    return out
+
+
+def benchmark_sci():
+    paths = sorted(glob.glob(os.path.join(IMAGE_DIR, '*.jpg')) + glob.glob(os.path.join(IMAGE_DIR, '*.JPG')))
+    frames = [f for f in (cv2.imread(p) for p in paths) if f is not None]
+    if not frames:
+        print(f"Không có ảnh trong {IMAGE_DIR}")
+        return
+
+    pres = {}
+    for name, mode, scale in MODES:
+        pres[name] = Tienxulyanh(target_size=TARGET_SIZE, rect=RECT, enhance_threshold=1.1,
+                                 enhance_mode=mode, sci_scale=scale)
+        if not pres[name].use_sci:
+            print("Không load được SCI, dừng benchmark")
+            return
+
+    times = {name: [] for name, _, _ in MODES}
+    quality = {name: [] for name, _, _ in MODES}
+
+    for frame in frames:
+        ref = run(pres["roi"], frame)
+
+        for name, _, _ in MODES:
+            pre = pres[name]
+            for _ in range(WARMUP_ITER):
+                run(pre, frame)
+
+            start = time.perf_counter()
+            for _ in range(TEST_ITER):
+                out = run(pre, frame)
+            times[name].append((time.perf_counter() - start) * 1000.0 / TEST_ITER)
+            quality[name].append(psnr(out, ref))
+
+    print("\n" + "="*60)
+    print(f"BENCHMARK SCI ({len(frames)} ảnh trong {IMAGE_DIR}, ROI {ROI_BOX}, rect={RECT})")
+    print("Chất lượng: PSNR so với cách cũ (SCI trên ROI gốc rồi letterbox)")
+    print("-" * 60)
+    print(f"{'Chế độ':<16}{'TB (ms)':>10}{'Max (ms)':>10}{'PSNR TB (dB)':>14}{'PSNR min':>10}")
+    for name, _, _ in MODES:
+        q = [v for v in quality[name] if np.isfinite(v)]
+        q_avg = f"{np.mean(q):.2f}" if q else "inf"
+        q_min = f"{np.min(q):.2f}" if q else "inf"
+        print(f"{name:<16}{np.mean(times[name]):>10.1f}{np.max(times[name]):>10.1f}{q_avg:>14}{q_min:>10}")
+    print("="*60)
+
+
+def benchmark_fused():
+    # SciEnhancer.apply (torch.from_numpy, BGR, ghi thẳng vào buffer) vs cách cũ (PIL + ToTensor)
+    paths = sorted(glob.glob(os.path.join(IMAGE_DIR, '*.jpg')) + glob.glob(os.path.join(IMAGE_DIR, '*.JPG')))
+    frames = [f for f in (cv2.imread(p) for p in paths) if f is not None]
+    if not frames:
+        print(f"Không có ảnh trong {IMAGE_DIR}")
+        return
+
+    pre = Tienxulyanh(target_size=TARGET_SIZE, rect=RECT)
+    if not pre.use_sci:
+        print("Không load được SCI, dừng benchmark")
+        return
+
+    # ảnh cỡ YOLO như chế độ "letterbox"
+    rois = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        y1, y2, x1, x2 = ROI_BOX
+        canvas, _, _ = pre.letterbox_into(frame[int(h*y1):int(h*y2), int(w*x1):int(w*x2)], reuse=False)
+        rois.append(canvas)
+
+    sci = pre.enhancers["sci"]
+    methods = [("PIL (cũ)", sci.apply_reference), ("fused", sci.apply)]
+    times = {name: [] for name, _ in methods}
+    peaks = {name: [] for name, _ in methods}
+    max_diff = 0
+
+    for roi in rois:
+        out_ref = sci.apply_reference(roi)
+        out_new = sci.apply(roi)
+        max_diff = max(max_diff, int(np.abs(out_ref.astype(np.int16) - out_new).max()))
+
+        for name, fn in methods:
+            for _ in range(WARMUP_ITER):
+                fn(roi)
+
+            start = time.perf_counter()
+            for _ in range(TEST_ITER):
+                fn(roi)
+            times[name].append((time.perf_counter() - start) * 1000.0 / TEST_ITER)
+
+            # bộ nhớ numpy / PIL cấp phát trong 1 lần gọi (tensor của torch không tính)
+            tracemalloc.start()
+            fn(roi)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks[name].append(peak / 1e6)
+
+    print("\n" + "="*60)
+    print(f"BENCHMARK SCI GỘP BƯỚC ({len(rois)} ảnh cỡ {rois[0].shape[1]}x{rois[0].shape[0]})")
+    print(f"Sai khác tối đa so với cách cũ: {max_diff} mức xám")
+    print("-" * 60)
+    print(f"{'Cách':<16}{'TB (ms)':>10}{'Max (ms)':>10}{'RAM numpy (MB)':>18}")
+    for name, _ in methods:
+        print(f"{name:<16}{np.mean(times[name]):>10.1f}{np.max(times[name]):>10.1f}{np.mean(peaks[name]):>18.2f}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    # python Rasp_sci.py fused -> chỉ so SCI gộp bước với cách cũ
+    if len(sys.argv) > 1 and sys.argv[1] == "fused":
+        benchmark_fused()
+    else:
+        benchmark_sci()
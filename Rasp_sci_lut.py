@@ -0,0 +1,122 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from pre_processor_image import Tienxulyanh
+from sci_lut import SciLUT, SciLUTFitter
+
+# --- CẤU HÌNH ---
+TRAIN_DIR = 'train/vehicle dataset/train/images'
+TEST_DIR = 'Image_Test'
+LUT_PATH = 'SCI/CVPR/weights/medium_lut.npz'
+LEVELS = 8
+MAX_IMAGES = 300                 # số ảnh train dùng để fit (lấy đều)
+# dataset chủ yếu là ảnh ban ngày -> làm tối ảnh để có dữ liệu cho các mức sáng thấp
+DARKEN = [1.0, 0.6, 0.4, 0.25, 0.15, 0.08]
+TEST_ITER = 10
+
+
+def list_images(folder):
+    exts = ('*.jpg', '*.JPG', '*.jpeg', '*.png')
+    return sorted(p for e in exts for p in glob.glob(os.path.join(folder, e)))
+
+
+def darken(img, factor):
+    return img if factor == 1.0 else cv2.convertScaleAbs(img, alpha=factor)
+
+
+def fit_lut(pre):
+    paths = list_images(TRAIN_DIR)
+    if not paths:
+        print(f"Không có ảnh trong {TRAIN_DIR}")
+        return None
+    paths = paths[::max(1, len(paths) // MAX_IMAGES)][:MAX_IMAGES]
+
+    fitter = SciLUTFitter(levels=LEVELS)
+    start = time.perf_counter()
+    for i, path in enumerate(paths):
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        # fit ở cỡ ảnh YOLO như khi chạy thật (enhance_mode="letterbox")
+        img, _, _ = pre.letterbox_into(img, reuse=False)
+        for factor in DARKEN:
+            dark = darken(img, factor)
+            fitter.add(dark, pre.enhancers["sci"].apply(dark), pre._calculate_brightness(dark))
+        if (i + 1) % 50 == 0:
+            print(f"Đã fit {i+1}/{len(paths)} ảnh...")
+
+    lut = fitter.fit()
+    lut.save(LUT_PATH)
+    print(f"Đã lưu LUT {LUT_PATH} ({len(paths)} ảnh x {len(DARKEN)} mức tối, "
+          f"{time.perf_counter() - start:.0f} s)")
+    return lut
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(TEST_ITER):
+        out = fn(*args)
+    return out, (time.perf_counter() - start) * 1000.0 / TEST_ITER
+
+
+def evaluate(pre, lut):
+    paths = list_images(TEST_DIR)
+    rows = {f: {"sci_ms": [], "lut_ms": [], "psnr": [], "psnr_none": []} for f in DARKEN}
+
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        img, _, _ = pre.letterbox_into(img, reuse=False)
+
+        for factor in DARKEN:
+            dark = darken(img, factor)
+            b = pre._calculate_brightness(dark)
+            ref, t_sci = timed(pre.enhancers["sci"].apply, dark)
+            out, t_lut = timed(lut.apply, dark, b)
+
+            row = rows[factor]
+            row["sci_ms"].append(t_sci)
+            row["lut_ms"].append(t_lut)
+            row["psnr"].append(psnr(out, ref))
+            row["psnr_none"].append(psnr(dark, ref))
+
+    print("\n" + "="*64)
+    print(f"SCI vs LUT trên {TEST_DIR} (cỡ YOLO), PSNR so với SCI thật")
+    print("-" * 64)
+    print(f"{'Làm tối':<10}{'SCI (ms)':>10}{'LUT (ms)':>10}{'PSNR LUT':>12}{'PSNR không tăng sáng':>22}")
+    for factor in DARKEN:
+        row = rows[factor]
+        if not row["sci_ms"]:
+            continue
+        print(f"{'x' + str(factor):<10}{np.mean(row['sci_ms']):>10.2f}{np.mean(row['lut_ms']):>10.2f}"
+              f"{np.mean(row['psnr']):>12.2f}{np.mean(row['psnr_none']):>22.2f}")
+    print("="*64)
+
+
+if __name__ == "__main__":
+    # python Rasp_sci_lut.py      -> fit LUT từ TRAIN_DIR rồi đánh giá
+    # python Rasp_sci_lut.py eval -> chỉ đánh giá LUT đã lưu
+    pre = Tienxulyanh(rect=True)
+    if not pre.use_sci:
+        print("Không load được SCI, dừng")
+        sys.exit(1)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "eval":
+        lut = SciLUT.load(LUT_PATH)
+    else:
+        lut = fit_lut(pre)
+
+    if lut is not None:
+        evaluate(pre, lut)
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_test", "project"))
+from detection_result import DetectionResult
+from tracker import VehicleTracker
+
+# --- CẤU HÌNH ---
+CLASS_NAMES = ['bus', 'car', 'motorbike', 'truck']
+DETECT_FPS = [2.0, 10.0]         # 2.0 = DETECT_FPS của app.py
+DURATION = 4.0                   # giây
+BOX = (80, 50)                   # kích thước box xe (px)
+# (tốc độ x px/s, y tâm, class): 2 làn song song + 1 xe đứng chờ
+VEHICLES = [
+    (200.0, 150, 1),
+    (-150.0, 260, 1),
+    (0.0, 380, 3),
+]
+
+
+def make_detection(t):
+    xyxy, cls = [], []
+    for speed, cy, k in VEHICLES:
+        cx = 320 + speed * (t - DURATION / 2)
+        xyxy.append([cx - BOX[0] / 2, cy - BOX[1] / 2, cx + BOX[0] / 2, cy + BOX[1] / 2])
+        cls.append(k)
+    return DetectionResult(np.array(xyxy), np.ones(len(cls)), np.array(cls), CLASS_NAMES, timestamp=t)
+
+
+def check_tracker():
+    """Mỗi xe giả lập phải giữ đúng 1 ID và được đếm đúng 1 lần ở mọi tần số detect."""
+    print("="*72)
+    print(f"TRACKER: {len(VEHICLES)} xe, {DURATION:.0f}s, tốc độ {[v[0] for v in VEHICLES]} px/s")
+    print("-" * 72)
+    print(f"{'Detect FPS':>10}{'Số ID':>8}{'Xe khác nhau':>15}{'Hàng chờ':>10}{'Kết quả':>12}")
+
+    ok_all = True
+    for fps in DETECT_FPS:
+        tracker = VehicleTracker(class_names=CLASS_NAMES)
+        ids = set()
+        for t in np.arange(0.0, DURATION, 1.0 / fps):
+            ids.update(int(i) for i in tracker.update(make_detection(float(t))))
+        stats = tracker.stats(interval=DURATION + 1)
+
+        ok = len(ids) == len(VEHICLES) and stats["unique_total"] == len(VEHICLES)
+        ok_all &= ok
+        print(f"{fps:>10.1f}{len(ids):>8d}{stats['unique_total']:>15d}{stats['queue_length']:>10d}"
+              f"{'OK' if ok else 'SAI':>12}")
+    print("="*72)
+    return ok_all
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_tracker() else 1)
@@ -9,4 +9,14 @@ export FLASK_APP="$APP_PATH"
 export FLASK_ENV=production
 export PYTHONUNBUFFERED=1
 
-flask run --host=0.0.0.0 --port=5000
+# asgi  : Quart + Hypercorn (asyncio, inference chạy trong thread pool)
+# flask : Flask dev server cũ
+SERVER_MODE="${SERVER_MODE:-asgi}"
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    # 1 worker: camera + UART chỉ được mở bởi 1 process
+    cd "$(dirname "$APP_PATH")"
+    hypercorn asgi_app:app --bind 0.0.0.0:5000 --workers 1
+else
+    flask run --host=0.0.0.0 --port=5000
+fi
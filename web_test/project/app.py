@@ -1,27 +1,138 @@
+import time
+START_TIME = time.time()   # mốc đo thời gian khởi động (tới lần detect đầu tiên)
+
 from flask import Flask, render_template, jsonify, Response, request
-from ultralytics import YOLO
 import os, atexit, platform, cv2
 import numpy as np
 import json
 
 # ==========================================================
 # 1. IMPORT MODULES
+# (không module nào ở đây import torch / ultralytics: model được load bởi
+#  ModelRegistry, ở thread nền nếu BACKGROUND_LOAD)
 # ==========================================================
 from camera import Camera
 from yoloxx import Yolo_AI
 from uart_service import UARTService
 from pre_processor_image import Tienxulyanh
+from detection_engine import DetectionEngine
+from stream_encoder import StreamEncoder
+from multi_camera import MultiCameraDetector
+from result_broadcaster import ResultBroadcaster
+from detection_store import DetectionStore
+from tracker import VehicleTracker
+from count_aggregator import CountAggregator
+from motion_gate import MotionGate
+from day_night import DayNightSwitch
+from model_registry import get_registry
+from resource_manager import ResourceManager
 
 # ==========================================================
 # 2. PATH CONFIG
 # ==========================================================
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = "runs/detect/yolov26_trained/weights/best.pt"
+# Backend inference: "torch" / "onnx" / "ncnn" (export + cache cạnh best.pt lần đầu chạy,
+# kiểm tra số xe giữa các backend: Rasp_backend.py).
+# Model INT8 (Rasp_quantize.py): MODEL_PATH = ".../best_int8.onnx" + MODEL_BACKEND = "onnx"
+MODEL_BACKEND = "onnx"
+MODEL_IMGSZ = 640
+# Chạy mồi YOLO + enhancer lúc khởi động (như WARMUP_ITER của Rasp_thongso.py),
+# kích thước frame camera dùng để suy ra cỡ ảnh letterbox cần mồi
+WARMUP_ITER = 3
+WARMUP_FRAME = (480, 640)
+# Load model ở thread nền: server + UART chạy ngay khi khởi động (systemd restart),
+# trong lúc load /health trả 503 và lệnh UART không được gửi (ESP32 dùng thời gian mặc định)
+BACKGROUND_LOAD = True
 
 STATIC_DIR = os.path.join(APP_DIR, "static")
 UPLOAD_DIR = os.path.join(STATIC_DIR, "uploads")
 OUTPUT_DIR = os.path.join(STATIC_DIR, "outputs")
 
+# Detect nền: số lần detect / giây và tuổi tối đa của kết quả được dùng lại
+DETECT_FPS = 2.0
+RESULT_MAX_AGE = 2.0
+ROI_BOX = [0.1, 0.9, 0.0, 1.0]
+# Letterbox chữ nhật: chỉ pad ROI tới bội số LETTERBOX_STRIDE thay vì vuông 640x640
+LETTERBOX_RECT = True
+LETTERBOX_STRIDE = 32
+
+# Độ sáng (quyết định bật SCI): "fast" lấy mẫu 1/BRIGHTNESS_STEP pixel, "hsv" như cũ.
+# EMA làm mượt giữa các frame camera (xem Rasp_brightness.py để so sai số / tốc độ)
+BRIGHTNESS_MODE = "fast"
+BRIGHTNESS_STEP = 4
+BRIGHTNESS_EMA = 0.5
+
+# Chuyển ngày / đêm (bật SCI) có trễ: vào đêm < NIGHT_ENTER, về ngày > NIGHT_EXIT,
+# giữ mỗi chế độ ít nhất LIGHT_MIN_DWELL giây. NIGHT_HOURS = (18, 6) để gợi ý theo giờ
+NIGHT_ENTER = 0.35
+NIGHT_EXIT = 0.45
+LIGHT_MIN_DWELL = 30.0
+NIGHT_HOURS = None
+
+# Tăng sáng đêm: "roi" (ROI gốc rồi letterbox, cách cũ) / "letterbox" (trên ảnh cỡ YOLO) /
+# "lowres" (như letterbox, SCI tính illumination ở ảnh thu nhỏ SCI_SCALE lần). Số liệu: Rasp_sci.py
+ENHANCE_MODE = "letterbox"
+SCI_SCALE = 0.5
+# Ngân sách thời gian tăng sáng / frame (ms): SCI nếu kịp, không thì LUT xấp xỉ
+# (fit bằng Rasp_sci_lut.py), không thì bỏ tăng sáng. None = luôn dùng bộ đầu của ENHANCERS
+LUT_PATH = "SCI/CVPR/weights/medium_lut.npz"
+ENHANCE_BUDGET_MS = 60.0
+# Bộ tăng sáng theo thứ tự ưu tiên: "sci" / "lut" / "zerodce" / "none"
+# (so sánh tốc độ + số xe YOLO đếm được: Rasp_enhancers.py)
+ENHANCERS = ["sci", "lut"]
+ZERO_DCE_SCALE = 4
+
+# Chia lõi CPU theo vai trò thread (Pi 5: lõi 0-3), {} = không ghim.
+# Số thread ONNX Runtime (YOLO), None = số lõi của "infer"; torch, None = số lõi
+# "infer" nếu YOLO chạy torch, không thì "preprocess" (SCI / Zero-DCE);
+# OpenCV cho cả process, None = mặc định của thư viện.
+# Tìm cách chia tốt nhất trên máy thật: Rasp_affinity.py
+CPU_PLAN = {
+    "camera": [0], "capture": [0], "encode": [0],
+    "preprocess": [1], "store": [1],
+    "infer": [2, 3], "multi": [2, 3]
+}
+TORCH_THREADS = None
+ORT_THREADS = None
+CV2_THREADS = 1
+
+# MJPEG stream: chất lượng JPEG, hệ số thu nhỏ ảnh, FPS tối đa
+STREAM_QUALITY = 80
+STREAM_SCALE = 1.0
+STREAM_MAX_FPS = 15.0
+
+# Chế độ nhiều hướng: {"tên hướng": index camera / file video / URL}, rỗng = tắt.
+# vd. {"north": 1, "south": "videos/south.mp4", "east": "rtsp://192.168.1.20/stream"}
+CAMERA_SOURCES = {}
+MULTI_DETECT_FPS = 1.0
+
+# Kết quả được đẩy qua SSE (/events), trình duyệt không có SSE thì hỏi
+# /last_detection; file last_detection.json chỉ cho client cũ đọc thẳng file
+# (tắt để không ghi thẻ SD mỗi lần detect)
+WRITE_LAST_DETECTION_JSON = False
+
+# Số lần detect giữ lại để render ảnh theo yêu cầu / số ảnh JPEG đã render được cache
+DETECTION_HISTORY = 16
+RENDER_CACHE = 8
+
+# Tracking: khoảng thời gian (giây) để đếm số xe khác nhau
+TRACK_INTERVAL = 60.0
+
+# Gộp số xe nhiều lần detect trước khi tính tín hiệu (chống nhiễu 1 frame)
+SIGNAL_WINDOW = 10.0             # giây
+SIGNAL_METHOD = "median"         # median / percentile / mean / ema
+SIGNAL_PERCENTILE = 75.0
+SIGNAL_EMA_ALPHA = 0.3
+# hệ số quy đổi theo class ['bus', 'car', 'motorbike', 'truck']
+CLASS_WEIGHTS = [2.0, 1.0, 1.0, 2.0]
+
+# Bỏ qua YOLO khi cảnh không đổi (so ảnh xám thu nhỏ với lần detect trước)
+MOTION_GATE = True
+MOTION_THRESHOLD = 0.01          # tỉ lệ pixel thay đổi để detect lại
+MOTION_PIXEL_DELTA = 20          # mức xám lệch tối thiểu của 1 pixel
+MOTION_MAX_SKIP = 10.0           # giây, quá lâu không detect thì vẫn detect lại
+
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -30,23 +141,67 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # ==========================================================
 app = Flask(__name__, static_folder=STATIC_DIR)
 
-# Load YOLO
-try:
-    model = YOLO(MODEL_PATH)
-    print(f"✅ Load Model OK: {MODEL_PATH}")
-except Exception as e:
-    print(f"❌ Load Model Fail: {e}")
-    model = None
-
-cam = Camera(src=0)
-pre_proc = Tienxulyanh(target_size=(640, 640))
-ai = Yolo_AI(model, class_names=['bus', 'car', 'motorbike', 'truck'])
+resources = ResourceManager(plan=CPU_PLAN, torch_threads=TORCH_THREADS, cv2_threads=CV2_THREADS,
+                            ort_threads=ORT_THREADS)
+resources.apply_threads()
+
+# YOLO + enhancer 1 lần cho cả process (các thread request / vòng detect dùng chung),
+# được load ở mục 8 (MODEL LOADER)
+registry = get_registry(model_path=MODEL_PATH, backend=MODEL_BACKEND, imgsz=MODEL_IMGSZ,
+                        enhancers=ENHANCERS, warmup_iter=WARMUP_ITER, ort_threads=resources.ort_threads,
+                        enhancer_kwargs={"sci_lowres": ENHANCE_MODE == "lowres", "sci_scale": SCI_SCALE,
+                                         "lut_path": LUT_PATH, "dce_scale": ZERO_DCE_SCALE})
+
+# mốc thời gian khởi động (giây tính từ START_TIME)
+startup = {"init_s": None, "models_ready_s": None, "first_detection_s": None}
+
+cam = Camera(src=0, thread_init=resources.pin)
+day_night = DayNightSwitch(enter_night=NIGHT_ENTER, exit_night=NIGHT_EXIT,
+                           min_dwell=LIGHT_MIN_DWELL, night_hours=NIGHT_HOURS)
+pre_proc = Tienxulyanh(target_size=(640, 640), rect=LETTERBOX_RECT, stride=LETTERBOX_STRIDE,
+                       brightness_mode=BRIGHTNESS_MODE, brightness_step=BRIGHTNESS_STEP,
+                       brightness_ema=BRIGHTNESS_EMA, day_night=day_night,
+                       enhance_mode=ENHANCE_MODE, sci_scale=SCI_SCALE,
+                       lut_path=LUT_PATH, enhance_budget_ms=ENHANCE_BUDGET_MS,
+                       enhancers={})
+# model được gắn vào khi registry load xong (on_models_ready)
+ai = Yolo_AI(None, class_names=['bus', 'car', 'motorbike', 'truck'], backend=None)
 
 uart_port = "/dev/ttyAMA0" if platform.system() == "Linux" else "COM3"
 uart = UARTService(port=uart_port)
 
 cam.start()
 
+store = DetectionStore(capacity=DETECTION_HISTORY, render_cache=RENDER_CACHE)
+
+motion_gate = None
+if MOTION_GATE:
+    motion_gate = MotionGate(threshold=MOTION_THRESHOLD, pixel_delta=MOTION_PIXEL_DELTA,
+                             max_skip=MOTION_MAX_SKIP, roi_box=ROI_BOX)
+
+engine = DetectionEngine(cam, pre_proc, ai, target_fps=DETECT_FPS, roi_box=ROI_BOX, store=store,
+                         motion_gate=motion_gate, thread_init=resources.pin)
+
+stream_encoder = StreamEncoder(cam, quality=STREAM_QUALITY, scale=STREAM_SCALE,
+                               max_fps=STREAM_MAX_FPS, thread_init=resources.pin)
+
+multi = None
+if CAMERA_SOURCES:
+    # 1 model dùng cho mọi hướng, YOLO chạy 1 batch / tick (start khi model sẵn sàng)
+    multi = MultiCameraDetector(CAMERA_SOURCES, pre_proc, ai,
+                                target_fps=MULTI_DETECT_FPS, roi_box=ROI_BOX,
+                                pre_lock=engine.pre_lock, infer_lock=engine.infer_lock,
+                                thread_init=resources.pin)
+
+broadcaster = ResultBroadcaster()
+
+# gán ID cho xe qua các lần detect của vòng nền (đếm xe không trùng, hàng chờ, dwell)
+tracker = VehicleTracker(class_names=ai.class_names)
+
+aggregator = CountAggregator(class_weights=CLASS_WEIGHTS, window=SIGNAL_WINDOW,
+                             method=SIGNAL_METHOD, percentile=SIGNAL_PERCENTILE,
+                             ema_alpha=SIGNAL_EMA_ALPHA)
+
 selected_image = None
 
 # ==========================================================
@@ -65,51 +220,63 @@ def calculate_signal(total):
 # ==========================================================
 # 5. CORE DETECTION PIPELINE
 # ==========================================================
-def perform_detection():
+def perform_detection(include_images=False):
+    """
+    include_images: nhúng ảnh base64 vào JSON (kiểu cũ). Mặc định chỉ trả URL
+    /detections/<id>/... để ảnh được render khi trình duyệt thật sự tải.
+    """
     global selected_image
 
-    if model is None:
-        return {"error": "Model not loaded"}, "m0"
+    if ai.model is None:
+        # đang load nền / load lỗi: không gửi UART, ESP32 tự dùng thời gian mặc định
+        return {"error": "Model not loaded", "state": registry.state}, "m0"
+
+    # ===== 1. Lấy ảnh + 2. Preprocess + 3. Detect =====
+    from_camera = selected_image is None
 
-    # ===== 1. Lấy ảnh =====
     if selected_image is not None:
         print("[DETECT] Xử lý ảnh upload")
         frame = selected_image.copy()
         selected_image = None
+        result, total = engine.run_once(frame)
     else:
-        ret, frame = cam.read()
-        if not ret:
-            return {"error": "Camera không khả dụng"}, "m0"
-
-    # ===== 2. Preprocess =====
-    try:
-        ready_frame, brightness = pre_proc.process(
-            frame,
-            roi_box=[0.1, 0.9, 0.0, 1.0]
-        )
-    except Exception as e:
-        return {"error": f"Lỗi tiền xử lý: {e}"}, "m0"
-
-    # ===== 3. Detect =====
-    try:
-        result, total = ai.detect(ready_frame, brightness)
-    except Exception as e:
-        return {"error": f"Lỗi detect: {e}"}, "m0"
+        # Ưu tiên kết quả mới nhất của vòng detect nền (không chờ inference)
+        latest = engine.get_latest(max_age=RESULT_MAX_AGE)
+        if latest is not None:
+            result, total, frame = latest
+        else:
+            ret, frame = cam.read()
+            if not ret:
+                return {"error": "Camera không khả dụng"}, "m0"
+            result, total = engine.run_once(frame)
+            if not result.get("error"):
+                aggregator.add(result["counts"])
 
     if result.get("error"):
         return result, "m0"
 
-    # add original image as base64 (to avoid saving disk)
-    try:
-        import base64
-        _, buf = cv2.imencode('.jpg', frame)
-        b64 = base64.b64encode(buf).decode('utf-8')
-        result['input_image'] = f"data:image/jpeg;base64,{b64}"
-    except Exception:
-        pass
+    mark_startup("first_detection_s")
+
+    # ảnh gốc / ảnh detect: render lười qua DetectionStore (không encode cho lần trigger UART)
+    det_id = result.get("detection_id")
+    if det_id is not None:
+        result["input_image_url"] = store.url(det_id, "input")
+        result["processed_image_url"] = store.url(det_id, "annotated")
+
+        if include_images:
+            import base64
+            for kind, key in (("input", "input_image"), ("annotated", "processed_image")):
+                data = store.render(det_id, kind)
+                if data is not None:
+                    b64 = base64.b64encode(data).decode('utf-8')
+                    result[key] = f"data:image/jpeg;base64,{b64}"
 
     # ===== 4. Tính tín hiệu =====
-    total_seconds, cmd = calculate_signal(total)
+    # camera: nhu cầu đã gộp nhiều lần detect; ảnh upload: chỉ ảnh đó
+    demand = current_demand(result["counts"]) if from_camera else aggregator.weighted(result["counts"])
+    result["demand"] = round(demand, 2)
+
+    total_seconds, cmd = calculate_signal(demand)
 
     result["total_seconds"] = total_seconds
     result["green_seconds"] = max(0, total_seconds - 3)
@@ -117,21 +284,106 @@ def perform_detection():
     # ===== 5. Gửi UART =====
     uart.send(cmd)
 
-    # ===== 6. Ghi last_detection.json để polling (chỉ chứa counts/brightness/ts) =====
-    try:
-        log_path = os.path.join(STATIC_DIR, 'last_detection.json')
-        with open(log_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "counts": result.get("counts"),
-                "total_vehicles": result.get("total_vehicles"),
-                "brightness": result.get("brightness"),
-                "timestamp": result.get("timestamp")
-            }, f, ensure_ascii=False)
-    except Exception:
-        pass
+    # ===== 6. Đẩy kết quả tới dashboard (SSE) =====
+    publish_result(result, demand, cmd, sent=True)
 
     return result, cmd
 
+def current_demand(counts):
+    # giá trị gộp trong cửa sổ, hoặc chính frame này nếu cửa sổ chưa có mẫu
+    demand = aggregator.value()
+    return aggregator.weighted(counts) if demand is None else demand
+
+def publish_result(result, demand, cmd, sent):
+    # chỉ counts/brightness/ts/tín hiệu + URL ảnh (render khi tải), không kèm ảnh
+    # sent=False (đề xuất của vòng detect nền) đi event "suggestion" riêng để
+    # không ghi đè kết quả chụp / upload / UART đang hiển thị trên dashboard
+    total_seconds, _ = calculate_signal(demand)
+    payload = {
+        "counts": result.get("counts"),
+        "total_vehicles": result.get("total_vehicles"),
+        "brightness": result.get("brightness"),
+        "timestamp": result.get("timestamp"),
+        "frame_id": result.get("frame_id"),
+        "detection_id": result.get("detection_id"),
+        "input_image_url": result.get("input_image_url"),
+        "processed_image_url": result.get("processed_image_url"),
+        "demand": round(demand, 2),
+        "cmd": cmd,
+        "sent": sent,
+        "total_seconds": total_seconds,
+        "green_seconds": max(0, total_seconds - 3)
+    }
+
+    broadcaster.publish(payload, event="detection" if sent else "suggestion")
+
+    if WRITE_LAST_DETECTION_JSON and sent:
+        try:
+            log_path = os.path.join(STATIC_DIR, 'last_detection.json')
+            with open(log_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+        except Exception:
+            pass
+
+def mark_startup(key):
+    # ghi mốc khởi động lần đầu xảy ra
+    if startup[key] is None:
+        startup[key] = round(time.time() - START_TIME, 2)
+        print(f"[STARTUP] {key} = {startup[key]}s")
+
+def on_engine_result(result, total, det):
+    mark_startup("first_detection_s")
+
+    if det is not None:
+        tracker.update(det, t=result.get("capture_ts"))
+
+    aggregator.add(result["counts"], t=result.get("capture_ts"))
+
+    # kết quả của vòng detect nền: hiển thị ngay, lệnh chỉ là đề xuất (chưa gửi UART)
+    demand = current_demand(result["counts"])
+    _, cmd = calculate_signal(demand)
+    publish_result(result, demand, cmd, sent=False)
+
+engine.on_result = on_engine_result
+
+def decode_image(data):
+    nparr = np.frombuffer(data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def collect_stats():
+    # thời gian từng stage (capture/preprocess/infer/encode) của vòng detect nền
+    stats = engine.stats()
+    stats["stream"] = stream_encoder.stats()
+    stats["store"] = store.stats()
+    stats["signal"] = aggregator.stats()
+    stats["light"] = day_night.stats()
+    stats["enhance"] = pre_proc.enhance_stats()
+    stats["model"] = {"path": MODEL_PATH, "backend": ai.backend, "state": registry.state}
+    stats["cpu"] = resources.stats()
+    return stats
+
+def health_payload():
+    data = registry.health()
+    data["engine_running"] = engine.running
+    # ready = model đã gắn vào Yolo_AI và vòng detect nền đang chạy
+    data["ready"] = data["ready"] and ai.model is not None and engine.running
+    data["startup"] = dict(startup)
+    return data
+
+def approaches_payload():
+    # số xe + tín hiệu đề xuất theo từng hướng (chế độ nhiều camera), None nếu tắt
+    if multi is None:
+        return None
+
+    out = {}
+    for name, res in multi.get_latest().items():
+        total_seconds, cmd = calculate_signal(aggregator.weighted(res.get("counts", [])))
+        res["total_seconds"] = total_seconds
+        res["cmd"] = cmd
+        out[name] = res
+
+    return {"approaches": out, "stats": multi.stats()}
+
 # ==========================================================
 # 6. ROUTES
 # ==========================================================
@@ -143,20 +395,89 @@ def index():
 @app.route('/camera_stream')
 def camera_stream():
     def gen():
-        while True:
-            ret, frame = cam.read()
-            if ret:
-                _, jpeg = cv2.imencode('.jpg', frame)
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' +
-                       jpeg.tobytes() + b'\r\n')
+        # mọi client dùng chung 1 lần encode / frame (StreamEncoder)
+        stream_encoder.subscribe()
+        try:
+            last_id = 0
+            while True:
+                item = stream_encoder.wait_chunk(last_id, timeout=1.0)
+                if item is None:
+                    continue
+                last_id, chunk = item
+                yield chunk
+        finally:
+            stream_encoder.unsubscribe()
     return Response(gen(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/events')
+def events():
+    # Server-Sent Events: đẩy kết quả detect ngay khi có
+    def gen():
+        last_seq, data = broadcaster.latest()
+        if data is not None:
+            yield ResultBroadcaster.format_sse(last_seq, data)
+        while True:
+            items = broadcaster.wait(last_seq, timeout=15.0)
+            if items is None:
+                # giữ kết nối qua proxy
+                yield ": keepalive\n\n"
+                continue
+            for seq, event, data in items:
+                last_seq = seq
+                yield ResultBroadcaster.format_sse(seq, data, event)
+
+    return Response(gen(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/last_detection')
+def last_detection():
+    # fallback cho trình duyệt không có SSE: kết quả "detection" mới nhất
+    _, data = broadcaster.latest()
+    if data is None:
+        return Response(status=204)
+    return Response(data, mimetype='application/json', headers={"Cache-Control": "no-cache"})
+
 @app.route('/camera_capture', methods=['POST'])
 def camera_capture():
-    res, _ = perform_detection()
+    # ?images=1 -> nhúng ảnh base64 như API cũ
+    res, _ = perform_detection(include_images=request.args.get("images") == "1")
     return jsonify(res)
 
+@app.route('/detections/<int:det_id>/<kind>.jpg')
+def detection_image(det_id, kind):
+    # kind: input (ảnh gốc) / annotated (ảnh có box), render khi được yêu cầu
+    # id đếm lại sau mỗi lần restart -> no-cache + ETag theo run_id của process
+    etag = store.etag(det_id, kind)
+    headers = {"Cache-Control": "no-cache", "ETag": etag}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers=headers)
+    data = store.render(det_id, kind)
+    if data is None:
+        return jsonify({"error": "Không còn ảnh cho detection này"}), 404
+    return Response(data, mimetype='image/jpeg', headers=headers)
+
+@app.route('/pipeline_stats')
+def pipeline_stats():
+    return jsonify(collect_stats())
+
+@app.route('/health')
+def health():
+    # 200 khi model đã load + warm-up xong, 503 khi đang khởi động / lỗi
+    data = health_payload()
+    return jsonify(data), 200 if data["ready"] else 503
+
+@app.route('/traffic_stats')
+def traffic_stats():
+    # số xe khác nhau / hàng chờ / dwell time từ tracker
+    return jsonify(tracker.stats(interval=TRACK_INTERVAL))
+
+@app.route('/approaches')
+def approaches():
+    data = approaches_payload()
+    if data is None:
+        return jsonify({"error": "Chế độ nhiều camera chưa bật (CAMERA_SOURCES)"}), 404
+    return jsonify(data)
+
 @app.route('/upload_image', methods=['POST'])
 def upload_image():
     global selected_image
@@ -166,8 +487,7 @@ def upload_image():
             return jsonify({"error": "Không có file"}), 400
 
         file = request.files['file']
-        nparr = np.frombuffer(file.read(), np.uint8)
-        selected_image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        selected_image = decode_image(file.read())
 
         if selected_image is None:
             return jsonify({"error": "Lỗi đọc ảnh"}), 400
@@ -193,9 +513,34 @@ def on_uart_trigger():
 uart.start_listening(on_uart_trigger)
 
 # ==========================================================
-# 8. CLEANUP
+# 8. MODEL LOADER
+# ==========================================================
+def on_models_ready(reg):
+    pre_proc.set_enhancers(reg.enhancers)
+    ai.model, ai.backend = reg.model, reg.model_backend
+    # torch đã được import khi load + đã biết backend YOLO -> giờ mới đặt được số thread
+    resources.apply_threads(backend=reg.model_backend)
+    mark_startup("models_ready_s")
+
+    engine.start()
+    if multi is not None:
+        multi.start()
+
+# mồi đúng cỡ ảnh vào YOLO của luồng camera (ROI + letterbox chữ nhật)
+warmup_frame, _, _ = pre_proc.process_with_meta(np.zeros(WARMUP_FRAME + (3,), np.uint8),
+                                                ROI_BOX, reuse=False)
+registry.start(shapes=[warmup_frame.shape[:2]], background=BACKGROUND_LOAD,
+               on_ready=on_models_ready, thread_init=resources.pin)
+mark_startup("init_s")
+
+# ==========================================================
+# 9. CLEANUP
 # ==========================================================
+atexit.register(lambda: engine.stop())
+atexit.register(lambda: stream_encoder.stop())
 atexit.register(lambda: cam.stop())
+if multi is not None:
+    atexit.register(lambda: multi.stop())
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000, debug=False)
\ No newline at end of file
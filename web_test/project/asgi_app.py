@@ -0,0 +1,165 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, render_template, jsonify, Response, request
+
+# ==========================================================
+# 1. CORE (camera, model, UART, vòng detect nền dùng chung với app.py)
+# ==========================================================
+import app as core
+
+# ==========================================================
+# 2. CONFIG
+# ==========================================================
+# Số thread chạy inference cho request (model đã có lock riêng, thêm worker
+# chỉ giúp xếp hàng request mà không chặn event loop)
+INFER_WORKERS = 2
+# Chu kỳ kiểm tra frame mới của MJPEG stream (không giữ thread cho mỗi client)
+STREAM_POLL = 0.5 / core.STREAM_MAX_FPS if core.STREAM_MAX_FPS > 0 else 0.02
+
+# ==========================================================
+# 3. INIT
+# ==========================================================
+app = Quart(__name__, static_folder=core.STATIC_DIR)
+# stream MJPEG chạy vô hạn -> bỏ timeout mặc định của Quart
+app.config["RESPONSE_TIMEOUT"] = None
+
+infer_pool = ThreadPoolExecutor(max_workers=INFER_WORKERS, thread_name_prefix="infer")
+
+
+async def run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(infer_pool, fn, *args)
+
+# ==========================================================
+# 4. ROUTES (giống app.py)
+# ==========================================================
+@app.route("/")
+async def index():
+    return await render_template("index.html", class_names=core.ai.class_names)
+
+@app.route('/camera_stream')
+async def camera_stream():
+    async def gen():
+        core.stream_encoder.subscribe()
+        try:
+            last_id = 0
+            while True:
+                frame_id, chunk = core.stream_encoder.latest_chunk()
+                if chunk is None or frame_id == last_id:
+                    await asyncio.sleep(STREAM_POLL)
+                    continue
+                last_id = frame_id
+                yield chunk
+        finally:
+            core.stream_encoder.unsubscribe()
+
+    response = Response(gen(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response.timeout = None
+    return response
+
+@app.route('/events')
+async def events():
+    # Server-Sent Events: mỗi client 1 asyncio.Queue, không giữ thread
+    async def gen():
+        q = core.broadcaster.subscribe_async()
+        try:
+            last_seq, data = core.broadcaster.latest()
+            if data is not None:
+                yield core.ResultBroadcaster.format_sse(last_seq, data).encode()
+            while True:
+                try:
+                    item = await asyncio.wait_for(q.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                seq, event, data = item
+                if seq <= last_seq:
+                    continue
+                last_seq = seq
+                yield core.ResultBroadcaster.format_sse(seq, data, event).encode()
+        finally:
+            core.broadcaster.unsubscribe_async(q)
+
+    response = Response(gen(), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.timeout = None
+    return response
+
+@app.route('/last_detection')
+async def last_detection():
+    _, data = core.broadcaster.latest()
+    if data is None:
+        return Response(b"", status=204)
+    return Response(data, mimetype='application/json', headers={"Cache-Control": "no-cache"})
+
+@app.route('/camera_capture', methods=['POST'])
+async def camera_capture():
+    # inference chạy trong pool, event loop vẫn phục vụ client khác
+    include_images = request.args.get("images") == "1"
+    res, _ = await run_in_pool(core.perform_detection, include_images)
+    return jsonify(res)
+
+@app.route('/detections/<int:det_id>/<kind>.jpg')
+async def detection_image(det_id, kind):
+    etag = core.store.etag(det_id, kind)
+    headers = {"Cache-Control": "no-cache", "ETag": etag}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(b"", status=304, headers=headers)
+    data = await run_in_pool(core.store.render, det_id, kind)
+    if data is None:
+        return jsonify({"error": "Không còn ảnh cho detection này"}), 404
+    return Response(data, mimetype='image/jpeg', headers=headers)
+
+@app.route('/pipeline_stats')
+async def pipeline_stats():
+    return jsonify(core.collect_stats())
+
+@app.route('/health')
+async def health():
+    data = core.health_payload()
+    return jsonify(data), 200 if data["ready"] else 503
+
+@app.route('/traffic_stats')
+async def traffic_stats():
+    return jsonify(core.tracker.stats(interval=core.TRACK_INTERVAL))
+
+@app.route('/approaches')
+async def approaches():
+    data = core.approaches_payload()
+    if data is None:
+        return jsonify({"error": "Chế độ nhiều camera chưa bật (CAMERA_SOURCES)"}), 404
+    return jsonify(data)
+
+@app.route('/upload_image', methods=['POST'])
+async def upload_image():
+    try:
+        files = await request.files
+        if 'file' not in files:
+            return jsonify({"error": "Không có file"}), 400
+
+        image = await run_in_pool(core.decode_image, files['file'].read())
+
+        if image is None:
+            return jsonify({"error": "Lỗi đọc ảnh"}), 400
+
+        core.selected_image = image
+        return jsonify({"success": True}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/clear_selected_image', methods=['POST'])
+async def clear_selected_image():
+    core.selected_image = None
+    return jsonify({"success": True}), 200
+
+# ==========================================================
+# 5. CLEANUP
+# ==========================================================
+@app.after_serving
+async def shutdown():
+    infer_pool.shutdown(wait=False)
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8000)
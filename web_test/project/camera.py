@@ -2,16 +2,26 @@ import cv2
 import threading
 import time
 
+import numpy as np
+
+from frame_buffer import FrameRing
+
 
 class Camera:
-    def __init__(self, src=0, reconnect_interval=5.0, max_fail=20):
+    def __init__(self, src=0, reconnect_interval=5.0, max_fail=20, ring_slots=8, loop_file=True,
+                 thread_init=None):
         self.src = src
+        self.loop_file = loop_file
+        self._is_file = isinstance(src, str) and "://" not in src
+        self.file_period = 1.0 / 30.0
         self.reconnect_interval = reconnect_interval
         self.max_fail = max_fail
+        # thread_init("camera"): gọi ở đầu thread đọc (vd. ghim lõi CPU)
+        self.thread_init = thread_init
 
         self.cap = None
-        self.frame = None
-        self.lock = threading.Lock()
+        # frame được ghi thẳng vào slot cấp phát sẵn, reader nhận view không copy
+        self.ring = FrameRing(slots=ring_slots)
 
         self.running = False
         self.thread = None
@@ -25,15 +35,28 @@ class Camera:
                 pass
             self.cap = None
 
-        # Windows ưu tiên MSMF
-        self.cap = cv2.VideoCapture(self.src, cv2.CAP_MSMF)
+        if isinstance(self.src, str):
+            # file video / URL (rtsp://, http://...) -> backend mặc định (FFmpeg)
+            self.cap = cv2.VideoCapture(self.src)
+        else:
+            # Windows ưu tiên MSMF
+            self.cap = cv2.VideoCapture(self.src, cv2.CAP_MSMF)
+
+            if not self.cap.isOpened():
+                self.cap = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
 
-        if not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
+            if not self.cap.isOpened():
+                # Linux / Pi: V4L2 qua backend mặc định
+                self.cap = cv2.VideoCapture(self.src)
 
         if self.cap.isOpened():
             print(f"[CAM] Camera {self.src} đã kết nối.")
             self.fail_count = 0
+
+            if self._is_file:
+                fps = self.cap.get(cv2.CAP_PROP_FPS)
+                if fps and fps > 0:
+                    self.file_period = 1.0 / fps
         else:
             print(f"[CAM] Không tìm thấy camera. Thử lại sau {self.reconnect_interval}s...")
 
@@ -43,10 +66,13 @@ class Camera:
 
         self.running = True
         self._open()
-        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread = threading.Thread(target=self._reader, daemon=True, name=f"camera-{self.src}")
         self.thread.start()
 
     def _reader(self):
+        if self.thread_init is not None:
+            self.thread_init("camera")
+
         while self.running:
 
             if self.cap is None or not self.cap.isOpened():
@@ -54,12 +80,11 @@ class Camera:
                 time.sleep(self.reconnect_interval)
                 continue
 
-            ret, frame = self.cap.read()
-
-            if ret and frame is not None:
-                with self.lock:
-                    self.frame = frame.copy()
+            if self._read_into_ring():
                 self.fail_count = 0
+            elif self._is_file and self.loop_file:
+                # hết file video -> quay lại đầu (giả lập camera bằng file)
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
             else:
                 self.fail_count += 1
 
@@ -70,13 +95,79 @@ class Camera:
 
                 time.sleep(0.1)
 
-            time.sleep(0.01)
+            # file video: phát đúng FPS gốc thay vì đọc nhanh hết mức
+            time.sleep(self.file_period if self._is_file else 0.01)
+
+    def _read_into_ring(self):
+        slot, buf = self.ring.begin_write()
+
+        if buf is None:
+            if self.ring.shape() is not None:
+                # mọi slot đang bị giữ -> bỏ frame này nhưng vẫn rút khỏi driver
+                return self.cap.grab()
+
+            # frame đầu tiên: đọc bình thường để biết kích thước rồi cấp phát ring
+            ret, frame = self.cap.read()
+            if not ret or frame is None:
+                return False
+            return self._store_copy(frame)
+
+        ret, frame = self.cap.read(buf)
+
+        if not ret or frame is None:
+            self.ring.abort(slot)
+            return False
+
+        if not np.shares_memory(frame, buf):
+            # driver trả ảnh khác kích thước (đổi độ phân giải) -> cấp phát lại
+            self.ring.abort(slot)
+            return self._store_copy(frame)
+
+        self.ring.commit(slot)
+        return True
+
+    def _store_copy(self, frame):
+        self.ring.allocate(frame.shape, frame.dtype)
+        slot, buf = self.ring.begin_write()
+        buf[...] = frame
+        self.ring.commit(slot)
+        return True
+
+    def acquire(self):
+        """
+        FrameRef của frame mới nhất: ref.frame là view chỉ-đọc (không copy),
+        phải ref.release() (hoặc dùng with) sau khi dùng xong. None nếu chưa có frame.
+        """
+        return self.ring.acquire()
+
+    def acquire_new(self, after_id=0, timeout=1.0):
+        """
+        Như acquire() nhưng chờ (condition variable, không spin) tới khi có
+        frame với id > after_id. None nếu hết timeout mà không có frame mới.
+        """
+        return self.ring.acquire_new(after_id, timeout)
 
     def read(self):
-        with self.lock:
-            if self.frame is None:
-                return False, None
-            return True, self.frame.copy()
+        # API cũ: trả bản copy, caller được phép sửa ảnh
+        ref = self.ring.acquire()
+        if ref is None:
+            return False, None
+        with ref:
+            return True, ref.frame.copy()
+
+    def read_new(self, after_id=0, timeout=1.0):
+        """
+        Chờ frame mới hơn after_id, trả (ret, frame, frame_id, timestamp).
+        frame là bản copy; frame_id tăng dần, timestamp là time.time() lúc chụp.
+        """
+        ref = self.ring.acquire_new(after_id, timeout)
+        if ref is None:
+            return False, None, after_id, 0.0
+        with ref:
+            return True, ref.frame.copy(), ref.seq, ref.timestamp
+
+    def latest_id(self):
+        return self.ring.latest_seq()
 
     def is_opened(self):
         return self.cap is not None and self.cap.isOpened()
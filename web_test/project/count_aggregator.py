@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class CountAggregator:
+    """
+    Gộp số xe của nhiều lần detect trong cửa sổ `window` giây trước khi tính
+    tín hiệu, để 1 frame bị che / nhiễu không làm đổi cả pha đèn xanh.
+
+    method:
+        "median"     - trung vị trong cửa sổ
+        "percentile" - phân vị `percentile` (vd. 75 -> ưu tiên lúc đông)
+        "mean"       - trung bình
+        "ema"        - trung bình trượt mũ (ema_alpha), không cần cửa sổ
+    class_weights: hệ số theo class (vd. bus/truck tính nặng hơn xe máy).
+    """
+
+    METHODS = ("median", "percentile", "mean", "ema")
+
+    def __init__(self, class_weights=None, window=10.0, method="median",
+                 percentile=75.0, ema_alpha=0.3, min_samples=1):
+        if method not in self.METHODS:
+            raise ValueError(f"method phải là một trong {self.METHODS}")
+
+        self.class_weights = None if class_weights is None else np.asarray(class_weights, np.float64)
+        self.window = window
+        self.method = method
+        self.percentile = percentile
+        self.ema_alpha = ema_alpha
+        self.min_samples = min_samples
+
+        self.lock = threading.Lock()
+        self.samples = deque()
+        self.ema = None
+        self.last_t = None
+
+    # ================= INPUT =================
+
+    def weighted(self, counts):
+        counts = np.asarray(counts, np.float64)
+        if self.class_weights is None:
+            return float(counts.sum())
+        return float(np.dot(counts[:len(self.class_weights)], self.class_weights[:len(counts)]))
+
+    def add(self, counts, t=None):
+        t = time.time() if t is None else t
+        value = self.weighted(counts)
+
+        with self.lock:
+            self.samples.append((t, value))
+            self.ema = value if self.ema is None else \
+                self.ema_alpha * value + (1.0 - self.ema_alpha) * self.ema
+            self.last_t = t
+            self._trim(t)
+
+        return value
+
+    def _trim(self, now):
+        limit = now - self.window
+        while self.samples and self.samples[0][0] < limit:
+            self.samples.popleft()
+
+    # ================= OUTPUT =================
+
+    def value(self, now=None):
+        """Nhu cầu (số xe quy đổi) đã gộp, None nếu cửa sổ chưa đủ mẫu."""
+        with self.lock:
+            self._trim(time.time() if now is None else now)
+
+            if len(self.samples) < self.min_samples:
+                return None
+
+            if self.method == "ema":
+                return self.ema
+
+            values = np.fromiter((v for _, v in self.samples), np.float64, len(self.samples))
+
+        if self.method == "median":
+            return float(np.median(values))
+        if self.method == "percentile":
+            return float(np.percentile(values, self.percentile))
+        return float(values.mean())
+
+    def stats(self):
+        with self.lock:
+            n = len(self.samples)
+            last_t = self.last_t
+        return {
+            "method": self.method,
+            "window_s": self.window,
+            "samples": n,
+            "last_sample": last_t,
+            "demand": self.value()
+        }
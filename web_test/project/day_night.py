@@ -0,0 +1,109 @@
+import threading
+import time
+
+
+class DayNightSwitch:
+    """
+    Máy trạng thái ngày / đêm quyết định có chạy SCI hay không.
+
+    Thay vì 1 ngưỡng (brightness < 0.4) làm pipeline nhảy qua lại giữa đường
+    rẻ (ngày) và đường đắt (đêm, SCI) ở lúc chạng vạng, dùng:
+        - 2 ngưỡng trễ: vào đêm khi < enter_night, về ngày khi > exit_night
+        - min_dwell: giữ trạng thái ít nhất min_dwell giây sau mỗi lần đổi
+        - night_hours (tuỳ chọn): (giờ bắt đầu, giờ kết thúc) theo giờ máy, trong
+          khoảng này 2 ngưỡng được nâng thêm hint_bias (dễ vào đêm, khó về ngày),
+          ngoài khoảng này thì hạ xuống.
+    """
+
+    MODES = ("day", "night")
+
+    def __init__(self, enter_night=0.35, exit_night=0.45, min_dwell=30.0,
+                 night_hours=None, hint_bias=0.05):
+        if enter_night > exit_night:
+            raise ValueError("enter_night phải <= exit_night")
+
+        self.enter_night = enter_night
+        self.exit_night = exit_night
+        self.min_dwell = min_dwell
+        self.night_hours = night_hours
+        self.hint_bias = hint_bias
+
+        self.lock = threading.Lock()
+        self.mode = None
+        self.since = None
+        self.switches = 0
+        self.last_brightness = None
+
+        # mode -> [số lần, tổng ms, max ms] của cả chu kỳ capture -> kết quả
+        self.latency = {}
+
+    # ================= DECISION =================
+
+    def _is_night_hour(self, now):
+        if self.night_hours is None:
+            return None
+        start, end = self.night_hours
+        hour = time.localtime(now).tm_hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def thresholds(self, now=None):
+        """(enter_night, exit_night) sau khi áp gợi ý theo giờ."""
+        now = time.time() if now is None else now
+        hint = self._is_night_hour(now)
+        bias = 0.0 if hint is None else (self.hint_bias if hint else -self.hint_bias)
+        return self.enter_night + bias, self.exit_night + bias
+
+    def update(self, brightness, now=None):
+        """Cập nhật với độ sáng frame mới, trả về mode hiện tại ("day" / "night")."""
+        now = time.time() if now is None else now
+        enter, leave = self.thresholds(now)
+
+        with self.lock:
+            self.last_brightness = brightness
+
+            if self.mode is None:
+                self.mode = "night" if brightness < (enter + leave) / 2 else "day"
+                self.since = now
+                return self.mode
+
+            if now - self.since < self.min_dwell:
+                return self.mode
+
+            if self.mode == "day" and brightness < enter:
+                self.mode, self.since = "night", now
+                self.switches += 1
+            elif self.mode == "night" and brightness > leave:
+                self.mode, self.since = "day", now
+                self.switches += 1
+
+            return self.mode
+
+    # ================= LATENCY =================
+
+    def record_latency(self, mode, ms):
+        ms = float(ms)
+        with self.lock:
+            entry = self.latency.setdefault(mode, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] = max(entry[2], ms)
+
+    def stats(self):
+        now = time.time()
+        enter, leave = self.thresholds(now)
+
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "mode_for_s": round(now - self.since, 1) if self.since is not None else None,
+                "switches": self.switches,
+                "brightness": round(self.last_brightness, 3) if self.last_brightness is not None else None,
+                "enter_night": round(enter, 3),
+                "exit_night": round(leave, 3),
+                "latency_ms": {
+                    mode: {"count": n, "avg": round(total / n, 1), "max": round(worst, 1)}
+                    for mode, (n, total, worst) in self.latency.items() if n
+                }
+            }
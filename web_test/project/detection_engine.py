@@ -0,0 +1,272 @@
+import threading
+import time
+
+from pipeline import Pipeline, Stage
+
+
+class DetectionEngine:
+    """
+    Vòng detect chạy nền: liên tục lấy frame từ Camera, chạy
+    Tienxulyanh.process + Yolo_AI.detect ở tốc độ target_fps và giữ
+    kết quả mới nhất trong RAM để HTTP / UART trả về ngay lập tức.
+
+    Các bước capture -> preprocess -> infer -> store chạy song song
+    trên Pipeline (mỗi bước 1 thread, queue 1 phần tử, bỏ frame cũ).
+
+    motion_gate (MotionGate, tuỳ chọn): frame gần như không đổi so với lần
+    detect trước thì bỏ qua preprocess + YOLO và dùng lại kết quả cũ.
+    """
+
+    def __init__(self, cam, pre_proc, ai, target_fps=2.0, roi_box=None, queue_size=1,
+                 on_result=None, store=None, motion_gate=None, thread_init=None):
+        self.cam = cam
+        self.pre_proc = pre_proc
+        self.ai = ai
+        self.target_fps = target_fps
+        self.roi_box = roi_box
+        # on_result(result, total, det): gọi mỗi khi có kết quả mới (vd. đẩy SSE)
+        self.on_result = on_result
+        # DetectionStore: giữ ảnh gốc + kết quả thô để render ảnh khi có người xem
+        self.store = store
+        self.motion_gate = motion_gate
+
+        # pre_proc / model dùng chung với nhánh upload ảnh -> mỗi thứ 1 luồng tại 1 thời điểm
+        self.pre_lock = threading.Lock()
+        self.infer_lock = threading.Lock()
+
+        self.lock = threading.Lock()
+        self.latest = None
+        self.last_frame_id = 0
+
+        self.pipeline = Pipeline(
+            [
+                Stage("preprocess", self._stage_preprocess, maxsize=queue_size),
+                Stage("infer", self._stage_infer, maxsize=queue_size),
+                Stage("store", self._stage_store, maxsize=queue_size),
+            ],
+            source=self._capture,
+            source_fps=target_fps,
+            sink=self._store,
+            on_drop=self._release,
+            thread_init=thread_init
+        )
+
+    # ================= INFERENCE =================
+
+    def _preprocess(self, frame, smooth=False):
+        # ảnh letterbox nằm trong canvas dùng lại của pre_proc, meta để quy box về frame gốc
+        with self.pre_lock:
+            return self.pre_proc.process_with_meta(frame, roi_box=self.roi_box, smooth=smooth)
+
+    def _detect(self, ready_frame, brightness, meta=None):
+        try:
+            with self.infer_lock:
+                return self.ai.detect_raw(ready_frame, brightness, meta=meta)
+        finally:
+            # YOLO đọc xong -> trả canvas letterbox cho pre_proc dùng lại
+            self._release_canvas(ready_frame)
+
+    def _release_canvas(self, ready_frame):
+        release = getattr(self.pre_proc, "release_canvas", None)
+        if release is not None:
+            release(ready_frame)
+
+    def _keep(self, result, frame, det):
+        if self.store is not None:
+            result["detection_id"] = self.store.add(frame, det)
+
+    def run_once(self, frame):
+        """
+        Chạy preprocess + detect cho 1 frame (đồng bộ), frame phải là bản riêng của caller.
+        Trả về (result, total) giống Yolo_AI.detect (không kèm ảnh),
+        lỗi nằm trong result["error"].
+        """
+        try:
+            ready_frame, brightness, meta = self._preprocess(frame)
+        except Exception as e:
+            return {"error": f"Lỗi tiền xử lý: {e}"}, 0
+
+        try:
+            result, total, det = self._detect(ready_frame, brightness, meta)
+        except Exception as e:
+            return {"error": f"Lỗi detect: {e}"}, 0
+
+        if not result.get("error"):
+            self._keep(result, frame, det)
+        return result, total
+
+    # ================= PIPELINE STAGES =================
+
+    def _capture(self):
+        # view chỉ-đọc trên ring của Camera, slot được giữ tới khi item rời pipeline.
+        # Chỉ nhận frame mới hơn lần trước -> không detect lại frame trùng.
+        ref = self.cam.acquire_new(self.last_frame_id, timeout=0.5)
+        if ref is None:
+            return None
+        self.last_frame_id = ref.seq
+        return {"ref": ref, "frame": ref.frame, "t0": time.perf_counter()}
+
+    def _release(self, item):
+        ref = item.get("ref")
+        if ref is not None:
+            ref.release()
+        # item bị bỏ sau preprocess: canvas chưa được YOLO đọc
+        ready = item.pop("ready", None)
+        if ready is not None:
+            self._release_canvas(ready)
+
+    def _stage_preprocess(self, item):
+        if self.motion_gate is not None:
+            with self.lock:
+                has_latest = self.latest is not None
+            # ảnh tham chiếu chỉ được cập nhật ở _store, khi frame đã detect xong:
+            # item bị queue bỏ thì frame sau vẫn được so với frame đã có kết quả
+            changed, item["motion"], feature = self.motion_gate.measure(item["frame"])
+            if not changed and has_latest:
+                item["reuse"] = True
+                return item
+            item["motion_feature"] = feature
+
+        # frame liên tiếp của camera -> độ sáng làm mượt EMA
+        item["ready"], item["brightness"], item["meta"] = self._preprocess(item["frame"], smooth=True)
+        return item
+
+    def _reuse(self, item):
+        # cảnh không đổi: kết quả lần detect trước, gắn frame_id / thời điểm mới
+        with self.lock:
+            latest = self.latest
+        if latest is None:
+            return None
+
+        result = dict(latest["result"])
+        result["reused"] = True
+        item["total"] = latest["total"]
+        item["det"] = latest["det"]
+        item["prev_frame"] = latest["frame"]
+        return result
+
+    def _stage_infer(self, item):
+        if item.get("reuse"):
+            result = self._reuse(item)
+            if result is None:
+                return None
+        else:
+            meta = item.pop("meta")
+            item["light_mode"] = meta["light_mode"] if meta else None
+            result, total, det = self._detect(item.pop("ready"), item["brightness"], meta)
+            if result.get("error"):
+                print(f"[ENGINE] {result['error']}")
+                if self.motion_gate is not None:
+                    self.motion_gate.reset()
+                return None
+            item["total"] = total
+            item["det"] = det
+
+        result["frame_id"] = item["ref"].seq
+        result["capture_ts"] = item["ref"].timestamp
+        if "motion" in item:
+            result["motion"] = round(item["motion"], 4)
+        if item.get("light_mode"):
+            result["light_mode"] = item["light_mode"]
+
+        item["result"] = result
+        return item
+
+    def _stage_store(self, item):
+        if item.get("reuse"):
+            # giữ ảnh + detection_id của lần detect trước, không copy frame
+            self._release(item)
+            item["ref"] = None
+            item["frame"] = item.pop("prev_frame")
+            return item
+
+        # copy 1 lần ảnh gốc rồi trả slot cho ring camera; ảnh chỉ được encode khi có người xem
+        frame = item["frame"].copy()
+        self._release(item)
+        item["ref"] = None
+        item["frame"] = frame
+
+        self._keep(item["result"], frame, item["det"])
+        return item
+
+    def _store(self, item):
+        latency_ms = (time.perf_counter() - item["t0"]) * 1000.0
+        if self.motion_gate is not None and "motion_feature" in item:
+            self.motion_gate.commit(item.pop("motion_feature"))
+        with self.lock:
+            self.latest = {
+                "result": item["result"],
+                "total": item["total"],
+                "frame": item["frame"],
+                "det": item["det"],
+                "time": time.time(),
+                "latency_ms": latency_ms
+            }
+
+        # thời gian cả chu kỳ theo chế độ (day / night = có SCI / reused = motion gate bỏ qua)
+        day_night = getattr(self.pre_proc, "day_night", None)
+        if day_night is not None:
+            mode = "reused" if item.get("reuse") else item.get("light_mode")
+            if mode:
+                day_night.record_latency(mode, latency_ms)
+
+        if self.on_result is not None:
+            try:
+                self.on_result(item["result"], item["total"], item["det"])
+            except Exception as e:
+                print(f"[ENGINE] Lỗi on_result: {e}")
+
+    # ================= BACKGROUND LOOP =================
+
+    @property
+    def running(self):
+        return self.pipeline.running
+
+    def start(self):
+        self.pipeline.start()
+
+    def stop(self):
+        self.pipeline.stop()
+
+    # ================= READ RESULT =================
+
+    def get_latest(self, max_age=None):
+        """
+        Trả về (result, total, frame) của lần detect gần nhất,
+        hoặc None nếu chưa có / đã cũ hơn max_age giây.
+        """
+        with self.lock:
+            latest = self.latest
+
+        if latest is None:
+            return None
+
+        if max_age is not None and time.time() - latest["time"] > max_age:
+            return None
+
+        # copy dict để caller thêm field không ảnh hưởng bản dùng chung
+        return dict(latest["result"]), latest["total"], latest["frame"]
+
+    def get_latest_detection(self, max_age=None):
+        """DetectionResult (box/conf/cls dạng mảng) của lần detect gần nhất, hoặc None."""
+        with self.lock:
+            latest = self.latest
+
+        if latest is None:
+            return None
+        if max_age is not None and time.time() - latest["time"] > max_age:
+            return None
+        return latest["det"]
+
+    def stats(self):
+        with self.lock:
+            latest = self.latest
+
+        return {
+            "running": self.running,
+            "target_fps": self.target_fps,
+            "last_time": latest["time"] if latest else None,
+            "last_latency_ms": round(latest["latency_ms"], 1) if latest else None,
+            "stages": self.pipeline.stats(),
+            "motion_gate": self.motion_gate.stats() if self.motion_gate is not None else None
+        }
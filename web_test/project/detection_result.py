@@ -0,0 +1,134 @@
+import time
+
+import cv2
+import numpy as np
+
+
+# màu BGR cho từng class khi vẽ box
+PALETTE = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255),
+           (49, 210, 207), (10, 249, 72), (23, 204, 146), (134, 219, 61)]
+
+
+class DetectionResult:
+    """
+    Kết quả detect gọn, lưu bằng mảng NumPy:
+        xyxy  (N, 4) float32 - toạ độ box trên ảnh đưa vào YOLO
+                               (hoặc trên frame gốc sau map_to_source)
+        conf  (N,)   float32
+        cls   (N,)   int32
+        counts       - số xe theo class (list, cùng thứ tự class_names)
+        timing       - ms: preprocess / inference / postprocess của YOLO
+    Dùng lại cho vẽ ảnh, tracking, thống kê... mà không phải chạy lại model.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls", "counts", "class_names", "brightness",
+                 "timestamp", "timing", "image_shape", "image")
+
+    def __init__(self, xyxy, conf, cls, class_names, brightness=0.0, timestamp=None,
+                 timing=None, image_shape=None, image=None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls, dtype=np.int32).reshape(-1)
+        self.class_names = class_names
+        self.brightness = float(brightness)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.timing = timing or {}
+        self.image_shape = image_shape
+        # ảnh đã đưa vào YOLO (không serialize), để vẽ lười khi cần
+        self.image = image
+
+        num_classes = len(class_names)
+        valid = self.cls[(self.cls >= 0) & (self.cls < num_classes)]
+        self.counts = np.bincount(valid, minlength=num_classes).tolist()
+
+    # ================= BUILD =================
+
+    @classmethod
+    def from_ultralytics(cls, result, class_names, brightness=0.0, image=None):
+        boxes = result.boxes
+
+        if boxes is not None and len(boxes) > 0:
+            xyxy = boxes.xyxy.cpu().numpy()
+            conf = boxes.conf.cpu().numpy()
+            cls_ids = boxes.cls.cpu().numpy()
+        else:
+            xyxy = np.zeros((0, 4), np.float32)
+            conf = np.zeros((0,), np.float32)
+            cls_ids = np.zeros((0,), np.int32)
+
+        return cls(
+            xyxy, conf, cls_ids, class_names,
+            brightness=brightness,
+            timing=dict(getattr(result, "speed", None) or {}),
+            image_shape=tuple(result.orig_shape) if getattr(result, "orig_shape", None) else None,
+            image=image
+        )
+
+    def map_to_source(self, meta):
+        """
+        Quy box từ ảnh letterbox về toạ độ frame gốc (meta của
+        Tienxulyanh.process_with_meta). Bỏ tham chiếu ảnh letterbox vì canvas
+        sẽ được dùng lại -> vẽ lên frame gốc bằng draw(frame).
+        """
+        pad_x, pad_y = meta["pad"]
+        off_x, off_y = meta["roi_offset"]
+        roi_h, roi_w = meta["roi_shape"]
+        r = meta["ratio"]
+
+        if len(self.xyxy):
+            xyxy = (self.xyxy - np.array([pad_x, pad_y, pad_x, pad_y], np.float32)) / r
+            xyxy[:, 0::2] = np.clip(xyxy[:, 0::2], 0, roi_w) + off_x
+            xyxy[:, 1::2] = np.clip(xyxy[:, 1::2], 0, roi_h) + off_y
+            self.xyxy = xyxy.astype(np.float32)
+
+        self.image_shape = tuple(meta["source_shape"])
+        self.image = None
+        return self
+
+    # ================= ACCESS =================
+
+    @property
+    def total(self):
+        # số xe như Yolo_AI.detect cũ: chỉ class có trong class_names (khớp counts)
+        return int(sum(self.counts))
+
+    def __len__(self):
+        # số box (kể cả class ngoài class_names)
+        return int(len(self.cls))
+
+    def to_dict(self, with_boxes=False):
+        """Dict JSON (cùng khoá với Yolo_AI.detect), with_boxes=True để kèm toạ độ box."""
+        res = {
+            "counts": self.counts,
+            "total_vehicles": sum(self.counts),
+            "brightness": round(self.brightness, 2),
+            "timestamp": int(self.timestamp)
+        }
+
+        if with_boxes:
+            # float64 trước khi làm tròn để JSON không lộ sai số float32
+            res["boxes"] = np.round(self.xyxy.astype(np.float64), 1).tolist()
+            res["conf"] = np.round(self.conf.astype(np.float64), 3).tolist()
+            res["cls"] = self.cls.tolist()
+            res["timing"] = {k: round(v, 2) for k, v in self.timing.items()}
+
+        return res
+
+    # ================= DRAW =================
+
+    def draw(self, img=None, line_width=2):
+        """Vẽ box + nhãn lên bản copy của img (mặc định ảnh đã đưa vào YOLO)."""
+        img = self.image if img is None else img
+        if img is None:
+            return None
+
+        out = img.copy()
+        for (x1, y1, x2, y2), c, k in zip(self.xyxy.astype(np.int32), self.conf, self.cls):
+            color = PALETTE[int(k) % len(PALETTE)]
+            name = self.class_names[k] if 0 <= k < len(self.class_names) else str(k)
+
+            cv2.rectangle(out, (x1, y1), (x2, y2), color, line_width)
+            cv2.putText(out, f"{name} {c:.2f}", (x1, max(y1 - 4, 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+
+        return out
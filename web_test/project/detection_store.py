@@ -0,0 +1,114 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+import cv2
+
+
+class DetectionStore:
+    """
+    Giữ N lần detect gần nhất (ảnh gốc + DetectionResult) theo detection_id.
+    Ảnh chỉ được vẽ / encode JPEG khi có người xem (GET /detections/<id>/...),
+    bản JPEG đã render được giữ trong 1 LRU cache nhỏ.
+    detection_id đếm lại từ 1 mỗi lần process khởi động (systemd Restart=always)
+    -> URL / ETag mang thêm run_id riêng của process để trình duyệt không dùng
+    lại ảnh đã cache của lần chạy trước.
+    """
+
+    KINDS = ("input", "annotated")
+
+    def __init__(self, capacity=16, render_cache=8, quality=85):
+        self.capacity = capacity
+        self.render_cache = render_cache
+        self.quality = quality
+
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.run_id = uuid.uuid4().hex[:8]
+        self.items = OrderedDict()
+        self.renders = OrderedDict()
+
+        self.rendered = 0
+        self.cache_hits = 0
+
+    # ================= ADD =================
+
+    def add(self, frame, det):
+        """
+        frame: ảnh gốc (BGR) - phải là bản riêng, không phải view của ring camera.
+        det: DetectionResult của Yolo_AI (dùng để vẽ box khi cần).
+        Trả về detection_id.
+        """
+        with self.lock:
+            self.next_id += 1
+            det_id = self.next_id
+            self.items[det_id] = (frame, det)
+
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+            return det_id
+
+    # ================= URL / CACHE =================
+
+    def url(self, det_id, kind):
+        return f"/detections/{det_id}/{kind}.jpg?run={self.run_id}"
+
+    def etag(self, det_id, kind):
+        return f'"{self.run_id}-{det_id}-{kind}"'
+
+    # ================= RENDER =================
+
+    def _draw(self, kind, frame, det):
+        if kind == "input":
+            return frame
+        if det is None:
+            return None
+        if det.image is None:
+            # box đã quy về toạ độ frame gốc -> vẽ thẳng lên ảnh gốc
+            return det.draw(frame)
+        return det.draw()
+
+    def render(self, det_id, kind):
+        """JPEG bytes của ảnh `kind` ("input" / "annotated"), None nếu id đã hết hạn."""
+        if kind not in self.KINDS:
+            return None
+
+        key = (det_id, kind)
+        with self.lock:
+            if key in self.renders:
+                self.renders.move_to_end(key)
+                self.cache_hits += 1
+                return self.renders[key]
+
+            item = self.items.get(det_id)
+
+        if item is None:
+            return None
+
+        img = self._draw(kind, *item)
+        if img is None:
+            return None
+
+        ok, buf = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            return None
+        data = buf.tobytes()
+
+        with self.lock:
+            self.rendered += 1
+            self.renders[key] = data
+            while len(self.renders) > self.render_cache:
+                self.renders.popitem(last=False)
+
+        return data
+
+    def stats(self):
+        with self.lock:
+            return {
+                "run_id": self.run_id,
+                "stored": len(self.items),
+                "last_id": self.next_id,
+                "rendered": self.rendered,
+                "cache_hits": self.cache_hits
+            }
@@ -0,0 +1,255 @@
+import copy
+import os
+import warnings
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from sci_lut import SciLUT
+
+
+# ==========================================================
+# Bộ tăng sáng ảnh đêm dùng chung 1 giao diện:
+#     apply(frame, brightness, out=None) -> ảnh BGR uint8
+# frame: ảnh BGR uint8, out: buffer đích (có thể là chính frame / view trong canvas)
+# ==========================================================
+
+def _to_tensor(frame, buf, device):
+    """uint8 HWC BGR -> tensor (1, 3, H, W) float [0, 1], dùng lại buf nếu cùng kích thước."""
+    h, w = frame.shape[:2]
+    if buf is None or buf.shape[2:] != (h, w):
+        buf = torch.empty((1, 3, h, w), dtype=torch.float32, device=device)
+
+    # from_numpy chỉ tạo view (không copy); frame từ ring camera là chỉ-đọc
+    # nhưng ở đây chỉ đọc nên bỏ cảnh báo non-writable
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        src = torch.from_numpy(frame)
+
+    buf[0].copy_(src.permute(2, 0, 1))
+    buf.mul_(1.0 / 255.0)
+    return buf
+
+
+def _to_uint8(t, frame, out=None):
+    """tensor (1, 3, H, W) đã nhân 255 -> ghi vào out (uint8 HWC), cắt phần thập phân."""
+    if out is None:
+        out = np.empty(frame.shape, np.uint8)
+    torch.from_numpy(out).permute(2, 0, 1).copy_(t[0])
+    return out
+
+
+class Enhancer:
+    """Không tăng sáng (giữ nguyên ảnh)."""
+
+    name = "none"
+
+    def apply(self, frame, brightness, out=None):
+        if out is None or out is frame:
+            return frame
+        out[...] = frame
+        return out
+
+
+class SciEnhancer(Enhancer):
+    """
+    SCI (Finetunemodel / EnhanceNetwork) gộp bước: frame BGR uint8 -> tensor
+    (view + 1 copy) -> mạng đã đảo kênh để nhận / trả BGR -> r = I / illu tại chỗ
+    -> ghi thẳng vào out. lowres=True: illumination tính ở ảnh thu nhỏ `scale` lần.
+    """
+
+    name = "sci"
+
+    def __init__(self, weights="SCI/CVPR/weights/medium.pt", device=None, lowres=False, scale=0.5):
+        from model_sci import Finetunemodel
+
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"Không tìm thấy weight tại {weights}")
+
+        self.device = device or torch.device('cpu')
+        self.lowres = lowres
+        self.scale = scale
+
+        self.net = Finetunemodel(weights).to(self.device).eval()
+        self.bgr = self._build_bgr()
+        # tensor đầu vào (1, 3, H, W) float32 cấp phát sẵn, cấp lại khi đổi kích thước
+        self.input = None
+
+    def _build_bgr(self):
+        # đảo kênh vào của conv đầu và kênh ra của conv cuối
+        # (các lớp giữa không phụ thuộc thứ tự màu) -> bỏ cvtColor
+        net = copy.deepcopy(self.net.enhance)
+        with torch.no_grad():
+            first = net.in_conv[0]
+            first.weight.copy_(first.weight.flip(1))
+            last = net.out_conv[0]
+            last.weight.copy_(last.weight.flip(0))
+            last.bias.copy_(last.bias.flip(0))
+        return net.eval()
+
+    def apply(self, frame, brightness=None, out=None):
+        if self.lowres:
+            res = self.apply_lowres(frame)
+            if out is None:
+                return res
+            out[...] = res
+            return out
+
+        self.input = x = _to_tensor(frame, self.input, self.device)
+
+        with torch.no_grad():
+            illu = self.bgr(x)
+            r = torch.div(x, illu, out=illu)
+            r.clamp_(0, 1).mul_(255)
+
+        return _to_uint8(r, frame, out)
+
+    def apply_lowres(self, frame):
+        """
+        Ước lượng illumination trên ảnh thu nhỏ, phóng lại cỡ frame rồi tính
+        r = frame / illu ở độ phân giải đầy đủ. Phần mạng học được là thành phần
+        tần số thấp nên mất ít chất lượng, tốn ~scale^2 thời gian.
+        """
+        h, w = frame.shape[:2]
+        small_size = (max(1, int(round(w * self.scale))), max(1, int(round(h * self.scale))))
+        small = cv2.resize(frame, small_size, interpolation=cv2.INTER_AREA)
+        tensor = torch.from_numpy(small).to(self.device).permute(2, 0, 1).unsqueeze(0).float() / 255.0
+
+        # illu = clamp(input + fea): chỉ phần dư fea (mượt) tính ở ảnh nhỏ,
+        # input cộng lại ở độ phân giải đầy đủ để giữ chi tiết
+        net = self.bgr
+        with torch.no_grad():
+            fea = net.in_conv(tensor)
+            for conv in net.blocks:
+                fea = fea + conv(fea)
+            fea = net.out_conv(fea)
+
+        fea = fea[0].permute(1, 2, 0).contiguous().cpu().numpy()
+        fea = cv2.resize(fea, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        src = frame.astype(np.float32) * (1.0 / 255.0)
+        illu = np.clip(src + fea, 0.0001, 1.0)
+        enhanced = np.clip(cv2.divide(src, illu), 0.0, 1.0)
+        return (enhanced * 255).astype(np.uint8)
+
+    def apply_reference(self, frame):
+        """Cách cũ (PIL + ToTensor + RGB), chỉ để so sánh độ chính xác / tốc độ."""
+        from PIL import Image
+        import torchvision.transforms as transforms
+
+        # Convert BGR → RGB
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        # Convert sang PIL giống MemoryFriendlyLoader
+        pil_img = Image.fromarray(rgb)
+
+        # ToTensor giống dataset của bạn
+        tensor = transforms.ToTensor()(pil_img).unsqueeze(0).to(self.device)
+
+        with torch.no_grad():
+            _, r = self.net(tensor)
+
+        enhanced = r[0].permute(1, 2, 0).cpu().numpy()
+        enhanced = np.clip(enhanced, 0, 1)
+        enhanced = (enhanced * 255).astype(np.uint8)
+
+        return cv2.cvtColor(enhanced, cv2.COLOR_RGB2BGR)
+
+
+class LutEnhancer(Enhancer):
+    """Xấp xỉ SCI bằng bảng tra theo mức độ sáng (SciLUT, cv2.LUT)."""
+
+    name = "lut"
+
+    def __init__(self, path):
+        self.lut = SciLUT.load(path)
+
+    def apply(self, frame, brightness, out=None):
+        return self.lut.apply(frame, brightness, out=out)
+
+
+class ZeroDCEEnhancer(Enhancer):
+    """
+    Zero-DCE++ (enhance_net_nopool): đường cong tăng sáng ước lượng ở ảnh thu nhỏ
+    scale_factor lần rồi phóng lại. Ảnh được pad tới bội số của scale_factor để
+    upsample khớp kích thước, sau đó cắt lại. Trọng số cũng được đảo kênh -> BGR.
+    """
+
+    name = "zerodce"
+
+    def __init__(self, weights="Zero-DCE++/Epoch99.pth", device=None, scale_factor=4):
+        from model_dce import enhance_net_nopool
+
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"Không tìm thấy weight tại {weights}")
+
+        self.device = device or torch.device('cpu')
+        self.scale_factor = scale_factor
+
+        net = enhance_net_nopool(scale_factor)
+        net.load_state_dict(torch.load(weights, map_location="cpu"))
+        self.net = self._to_bgr(net).to(self.device).eval()
+        self.input = None
+
+    @staticmethod
+    def _to_bgr(net):
+        with torch.no_grad():
+            # conv đầu depthwise: mỗi kênh vào có filter riêng -> đảo filter + bias,
+            # rồi đảo kênh vào của point conv
+            first = net.e_conv1
+            first.depth_conv.weight.copy_(first.depth_conv.weight.flip(0))
+            first.depth_conv.bias.copy_(first.depth_conv.bias.flip(0))
+            first.point_conv.weight.copy_(first.point_conv.weight.flip(1))
+            # conv cuối: đảo kênh ra của point conv (đường cong áp theo từng kênh)
+            last = net.e_conv7.point_conv
+            last.weight.copy_(last.weight.flip(0))
+            last.bias.copy_(last.bias.flip(0))
+        return net
+
+    def apply(self, frame, brightness=None, out=None):
+        self.input = x = _to_tensor(frame, self.input, self.device)
+
+        h, w = frame.shape[:2]
+        s = self.scale_factor
+        pad_h, pad_w = (-h) % s, (-w) % s
+        if pad_h or pad_w:
+            x = F.pad(x, (0, pad_w, 0, pad_h), mode="replicate")
+
+        with torch.no_grad():
+            enhanced, _ = self.net(x)
+
+        enhanced = enhanced[:, :, :h, :w].clamp_(0, 1).mul_(255)
+        return _to_uint8(enhanced, frame, out)
+
+
+ENHANCERS = ("sci", "lut", "zerodce", "none")
+
+
+def build_enhancers(names, device=None, sci_weights="SCI/CVPR/weights/medium.pt",
+                    sci_lowres=False, sci_scale=0.5, lut_path=None,
+                    dce_weights="Zero-DCE++/Epoch99.pth", dce_scale=4):
+    """
+    names: danh sách theo thứ tự ưu tiên (tốt -> rẻ), vd. ["sci", "lut"].
+    Trả về dict {name: Enhancer}, bỏ qua (in cảnh báo) bộ nào không load được.
+    """
+    out = {}
+    for name in names:
+        try:
+            if name == "sci":
+                out[name] = SciEnhancer(sci_weights, device=device, lowres=sci_lowres, scale=sci_scale)
+            elif name == "lut":
+                if not lut_path:
+                    raise ValueError("chưa cấu hình lut_path")
+                out[name] = LutEnhancer(lut_path)
+            elif name == "zerodce":
+                out[name] = ZeroDCEEnhancer(dce_weights, device=device, scale_factor=dce_scale)
+            elif name == "none":
+                out[name] = Enhancer()
+            else:
+                raise ValueError(f"enhancer phải là một trong {ENHANCERS}")
+            print(f"✅ Loaded enhancer {name}")
+        except Exception as e:
+            print(f"⚠️ Lỗi load enhancer {name}: {e}")
+    return out
@@ -0,0 +1,150 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRef:
+    """
+    Tham chiếu tới 1 slot của FrameRing. frame là view chỉ-đọc (không copy),
+    slot được giữ nguyên cho tới khi release() (hoặc thoát khối with).
+    """
+
+    __slots__ = ("ring", "slot", "gen", "seq", "timestamp", "frame")
+
+    def __init__(self, ring, slot, gen, seq, timestamp, frame):
+        self.ring = ring
+        self.slot = slot
+        self.gen = gen
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def release(self):
+        if self.ring is not None:
+            self.ring.release(self.slot, self.gen)
+            self.ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """
+    Ring buffer cấp phát sẵn N slot ảnh. Thread camera ghi thẳng vào slot
+    trống (cap.read(dst)), reader nhận view chỉ-đọc của slot mới nhất kèm
+    số thứ tự; mỗi slot có bộ đếm tham chiếu nên writer không ghi đè slot
+    đang được đọc.
+    """
+
+    def __init__(self, slots=8):
+        self.num_slots = slots
+        self.lock = threading.Lock()
+        # báo cho reader đang chờ khi có frame mới
+        self.cond = threading.Condition(self.lock)
+
+        self.buffers = None
+        self.gen = 0
+        self.refs = [0] * slots
+        self.seqs = [0] * slots
+        self.times = [0.0] * slots
+        self.writing = -1
+
+        self.latest = -1
+        self.seq = 0
+
+    # ================= WRITER =================
+
+    def allocate(self, shape, dtype=np.uint8):
+        """Cấp phát lại toàn bộ slot (lần đầu hoặc khi camera đổi độ phân giải)."""
+        with self.lock:
+            # reader còn giữ slot cũ vẫn đọc được bộ nhớ cũ (numpy tự giải phóng khi hết view),
+            # gen mới để release() của FrameRef cũ không làm sai bộ đếm
+            self.gen += 1
+            self.refs = [0] * self.num_slots
+            self.buffers = [np.empty(shape, dtype) for _ in range(self.num_slots)]
+            self.latest = -1
+            self.writing = -1
+
+    def shape(self):
+        return None if self.buffers is None else self.buffers[0].shape
+
+    def begin_write(self):
+        """Trả về (slot, buffer) trống để ghi, hoặc (None, None) nếu mọi slot đang bận."""
+        with self.lock:
+            if self.buffers is None:
+                return None, None
+
+            for i in range(self.num_slots):
+                if i != self.latest and self.refs[i] == 0:
+                    self.writing = i
+                    return i, self.buffers[i]
+
+            return None, None
+
+    def commit(self, slot):
+        with self.lock:
+            self.seq += 1
+            self.seqs[slot] = self.seq
+            self.times[slot] = time.time()
+            self.latest = slot
+            self.writing = -1
+            self.cond.notify_all()
+            return self.seq
+
+    def abort(self, slot):
+        with self.lock:
+            if self.writing == slot:
+                self.writing = -1
+
+    # ================= READER =================
+
+    def _ref_latest(self):
+        # gọi khi đang giữ self.lock
+        slot = self.latest
+        if slot < 0:
+            return None
+
+        self.refs[slot] += 1
+        view = self.buffers[slot].view()
+        view.flags.writeable = False
+        return FrameRef(self, slot, self.gen, self.seqs[slot], self.times[slot], view)
+
+    def acquire(self):
+        """FrameRef của frame mới nhất (view chỉ-đọc), hoặc None nếu chưa có frame."""
+        with self.lock:
+            return self._ref_latest()
+
+    def acquire_new(self, after_seq=0, timeout=None):
+        """
+        Chờ tới khi có frame với seq > after_seq rồi trả FrameRef của frame mới nhất.
+        None nếu hết timeout (giây) mà chưa có frame mới.
+        """
+        with self.cond:
+            ok = self.cond.wait_for(
+                lambda: self.latest >= 0 and self.seq > after_seq,
+                timeout=timeout
+            )
+            if not ok:
+                return None
+            return self._ref_latest()
+
+    def latest_seq(self):
+        with self.lock:
+            return self.seq if self.latest >= 0 else 0
+
+    def release(self, slot, gen):
+        with self.lock:
+            if gen == self.gen and self.refs[slot] > 0:
+                self.refs[slot] -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "slots": self.num_slots,
+                "in_use": sum(1 for r in self.refs if r > 0),
+                "seq": self.seq
+            }
@@ -0,0 +1,96 @@
+import os
+import time
+
+import numpy as np
+from ultralytics import YOLO
+
+
+# ==========================================================
+# Backend inference cho Yolo_AI: cùng 1 file best.pt, chạy bằng
+#   "torch" - Ultralytics PyTorch (chậm nhất trên CPU Pi 5)
+#   "onnx"  - ONNX Runtime CPU (export dynamic -> giữ được letterbox chữ nhật)
+#   "ncnn"  - NCNN (kích thước vào cố định imgsz, Ultralytics tự pad vuông)
+# Bản export được cache cạnh file .pt và export lại khi .pt mới hơn.
+# Số thread của ONNX Runtime: set_ort_threads() (Ultralytics không nhận
+# SessionOptions qua YOLO(...), mặc định ORT lấy theo số lõi của cả máy).
+# ==========================================================
+
+BACKENDS = ("torch", "onnx", "ncnn")
+
+
+def export_path(model_path, backend):
+    """Đường dẫn bản export theo quy ước tên của Ultralytics."""
+    stem, _ = os.path.splitext(model_path)
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "ncnn":
+        return stem + "_ncnn_model"
+    return model_path
+
+
+def ensure_export(model_path, backend, imgsz=640):
+    """Trả về đường dẫn model cho backend, export + cache nếu chưa có / cũ hơn file .pt."""
+    if backend not in BACKENDS:
+        raise ValueError(f"backend phải là một trong {BACKENDS}")
+
+    # đã là file export (vd. MODEL_PATH trỏ thẳng vào .onnx) hoặc dùng PyTorch
+    if backend == "torch" or not model_path.endswith(".pt"):
+        return model_path
+
+    target = export_path(model_path, backend)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(model_path):
+        return target
+
+    print(f"[MODEL] Export {model_path} -> {backend} (imgsz={imgsz}), chỉ chạy lần đầu...")
+    t0 = time.perf_counter()
+
+    kwargs = {"format": backend, "imgsz": imgsz}
+    if backend == "onnx":
+        kwargs["dynamic"] = True
+    exported = YOLO(model_path).export(**kwargs)
+
+    print(f"[MODEL] Export xong sau {time.perf_counter() - t0:.1f}s: {exported}")
+    return str(exported)
+
+
+def load_model(model_path, backend="torch", imgsz=640, fallback=True):
+    """
+    Load YOLO theo backend. Lỗi export / load (thiếu onnxruntime, ncnn...) thì
+    quay về PyTorch nếu fallback=True. Trả về (model, backend thực tế dùng).
+    """
+    try:
+        path = ensure_export(model_path, backend, imgsz=imgsz)
+        return YOLO(path, task="detect"), backend
+    except Exception as e:
+        if not fallback or backend == "torch":
+            raise
+        print(f"[MODEL] Không dùng được backend {backend}: {e} -> dùng torch")
+        return YOLO(model_path), "torch"
+
+
+def set_ort_threads(model, threads, imgsz=640):
+    """
+    Tạo lại session ONNX Runtime của model với intra_op_num_threads=threads
+    (inter_op = 1). Gọi ở thread đã ghim lõi "infer": pool thread mới của ORT
+    kế thừa affinity của thread tạo session. Trả về True nếu đổi được.
+    """
+    import onnxruntime as ort
+
+    if getattr(model, "predictor", None) is None:
+        # Ultralytics chỉ tạo session ở lần predict đầu tiên
+        model(np.full((imgsz, imgsz, 3), 114, np.uint8), verbose=False)
+
+    # AutoBackend mới giữ session trong .backend, bản cũ giữ thẳng .session
+    auto = model.predictor.model
+    backend = getattr(auto, "backend", auto)
+    session = getattr(backend, "session", None)
+    if session is None or not hasattr(session, "_model_path"):
+        return False
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = int(threads)
+    opts.inter_op_num_threads = 1
+    backend.session = ort.InferenceSession(session._model_path, opts, providers=session.get_providers())
+    backend.session_options = opts
+    print(f"[MODEL] ONNX Runtime: {threads} thread intra-op")
+    return True
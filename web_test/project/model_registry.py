@@ -0,0 +1,209 @@
+import gc
+import threading
+import time
+
+import numpy as np
+
+
+# ==========================================================
+# Nơi giữ model dùng chung của cả process: YOLO + các bộ tăng sáng được load
+# 1 lần, chạy mồi (warm-up) trước khi nhận frame thật, báo trạng thái cho /health.
+# Service chạy 1 process (Flask thread / Hypercorn 1 worker), model load ở
+# thread nền sau khi server đã chạy -> không có fork sau khi load, không có
+# chia sẻ bộ nhớ copy-on-write giữa các worker. freeze() chỉ đưa weight / graph
+# đã load ra khỏi các lượt quét của GC (lượt gen 2 ngắn hơn khi đang detect).
+# ultralytics / torch chỉ được import khi load() -> start(background=True) để
+# server + UART chạy ngay, model load ở thread nền.
+# ==========================================================
+
+class ModelRegistry:
+    def __init__(self, model_path, backend="torch", imgsz=640, enhancers=(),
+                 enhancer_kwargs=None, warmup_iter=3, ort_threads=None):
+        self.model_path = model_path
+        self.backend = backend
+        self.imgsz = imgsz
+        self.enhancer_names = list(enhancers)
+        self.enhancer_kwargs = enhancer_kwargs or {}
+        self.warmup_iter = warmup_iter
+        # số thread intra-op của ONNX Runtime, None = mặc định của ORT
+        self.ort_threads = ort_threads
+
+        self.model = None
+        self.model_backend = None
+        self.enhancers = {}
+
+        # "idle" -> "loading" -> "warming" -> "ready" (hoặc "failed")
+        self.state = "idle"
+        self.error = None
+        self.timing = {}
+        self.warmup_ms = {}
+        self.frozen = False
+        self.created = time.time()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    # ================= LOAD =================
+
+    def _set_state(self, state, error=None):
+        with self.lock:
+            self.state = state
+            if error is not None:
+                self.error = error
+
+    def load(self):
+        """Load YOLO + enhancer (chỉ lần đầu gọi), trả về self."""
+        if self.model is not None:
+            return self
+
+        self._set_state("loading")
+        t0 = time.perf_counter()
+        try:
+            # import nặng (ultralytics kéo theo torch, torchvision...) chỉ ở đây
+            from model_backend import load_model
+            self.model, self.model_backend = load_model(self.model_path, self.backend, imgsz=self.imgsz)
+            if self.model_backend == "onnx" and self.ort_threads:
+                from model_backend import set_ort_threads
+                set_ort_threads(self.model, self.ort_threads, imgsz=self.imgsz)
+            print(f"✅ Load Model OK: {self.model_path} ({self.model_backend})")
+        except Exception as e:
+            print(f"❌ Load Model Fail: {e}")
+            self.model, self.model_backend = None, None
+            self._set_state("failed", str(e))
+        self.timing["model_s"] = round(time.perf_counter() - t0, 2)
+
+        # bộ tăng sáng lỗi chỉ bị bỏ qua (build_enhancers tự in cảnh báo)
+        t0 = time.perf_counter()
+        try:
+            from enhancers import build_enhancers
+        except Exception as e:
+            print(f"⚠️ Lỗi import enhancers: {e}")
+            return self
+        self.enhancers = build_enhancers(self.enhancer_names, **self.enhancer_kwargs)
+        self.timing["enhancers_s"] = round(time.perf_counter() - t0, 2)
+        return self
+
+    # ================= WARM-UP =================
+
+    def _time_passes(self, fn):
+        times = []
+        for _ in range(max(1, self.warmup_iter)):
+            t0 = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - t0) * 1000.0)
+        return {"first_ms": round(times[0], 1), "last_ms": round(times[-1], 1)}
+
+    def warmup(self, shapes=None):
+        """
+        Chạy mồi warmup_iter lần YOLO + từng enhancer trên ảnh giả (xám 114 cho YOLO,
+        ảnh tối cho enhancer) để lần detect thật đầu tiên không phải trả chi phí
+        khởi tạo graph / cấp phát bộ nhớ. shapes: các kích thước (h, w) ảnh vào YOLO
+        sẽ gặp (letterbox chữ nhật), mặc định (imgsz, imgsz).
+        """
+        if self.model is None:
+            return self
+
+        self._set_state("warming")
+        shapes = shapes or [(self.imgsz, self.imgsz)]
+        t0 = time.perf_counter()
+        try:
+            for h, w in shapes:
+                canvas = np.full((h, w, 3), 114, np.uint8)
+                self.warmup_ms[f"yolo_{h}x{w}"] = self._time_passes(
+                    lambda: self.model(canvas, conf=0.5, verbose=False))
+
+                dark = np.full((h, w, 3), 20, np.uint8)
+                for name, enhancer in self.enhancers.items():
+                    self.warmup_ms[f"{name}_{h}x{w}"] = self._time_passes(
+                        lambda: enhancer.apply(dark, 0.1, out=np.empty_like(dark)))
+        except Exception as e:
+            # mồi lỗi không chặn service, lần detect thật sẽ báo lỗi nếu có
+            print(f"⚠️ Lỗi warm-up: {e}")
+
+        self.timing["warmup_s"] = round(time.perf_counter() - t0, 2)
+        print(f"[MODEL] Warm-up xong sau {self.timing['warmup_s']}s: {self.warmup_ms}")
+        return self
+
+    # ================= START =================
+
+    def start(self, shapes=None, background=False, freeze=True, on_ready=None, thread_init=None):
+        """
+        load() + warmup() (+ freeze()), rồi gọi on_ready(registry) nếu load được model.
+        Chỉ chuyển "ready" khi on_ready chạy xong (model đã gắn vào service);
+        on_ready lỗi -> "failed".
+        background=True: chạy ở thread nền, trả về ngay (health báo "loading" / "warming").
+        thread_init("infer"): gọi trước khi load ở thread nền (vd. ghim lõi CPU cho
+        pool thread của backend được tạo lúc load / warm-up).
+        """
+        def run():
+            if background and thread_init is not None:
+                thread_init("infer")
+            self.load()
+            self.warmup(shapes)
+            if freeze:
+                self.freeze()
+            if self.model is None:
+                return
+            if on_ready is not None:
+                try:
+                    on_ready(self)
+                except Exception as e:
+                    print(f"❌ Lỗi khởi động sau khi load model: {e}")
+                    self._set_state("failed", str(e))
+                    return
+            self._set_state("ready")
+
+        if not background:
+            run()
+            return self
+
+        self._set_state("loading")
+        self.thread = threading.Thread(target=run, daemon=True, name="model-loader")
+        self.thread.start()
+        return self
+
+    # ================= GC =================
+
+    def freeze(self):
+        """
+        Gọi sau khi load + warm-up: mọi object hiện có không bị GC quét nữa.
+        Chỉ giúp chia sẻ bộ nhớ copy-on-write nếu tự triển khai kiểu load trước
+        rồi mới fork worker (repo không chạy như vậy).
+        """
+        gc.collect()
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+            self.frozen = True
+        return self
+
+    # ================= HEALTH =================
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def health(self):
+        with self.lock:
+            state, error = self.state, self.error
+        return {
+            "ready": state == "ready",
+            "state": state,
+            "error": error,
+            "model": self.model_path,
+            "backend": self.model_backend,
+            "enhancers": list(self.enhancers),
+            "timing": dict(self.timing),
+            "warmup_ms": dict(self.warmup_ms),
+            "frozen": self.frozen,
+            "uptime_s": round(time.time() - self.created, 1)
+        }
+
+
+_registry = None
+
+
+def get_registry(**kwargs):
+    """Registry của process, tạo 1 lần (app.py / asgi_app.py dùng chung)."""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(**kwargs)
+    return _registry
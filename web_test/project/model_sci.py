@@ -1,8 +1,12 @@
 import torch
 import torch.nn as nn
-from loss_sci import LossFunction
 
 
+def _make_criterion():
+    # import muộn: loss_sci chỉ cần cho train
+    from loss_sci import LossFunction
+    return LossFunction()
+
 
 class EnhanceNetwork(nn.Module):
     def __init__(self, layers, channels):
@@ -94,7 +98,7 @@ class Network(nn.Module):
         self.stage = stage
         self.enhance = EnhanceNetwork(layers=1, channels=3)
         self.calibrate = CalibrateNetwork(layers=3, channels=16)
-        self._criterion = LossFunction()
+        self._criterion = _make_criterion()
 
     def weights_init(self, m):
         if isinstance(m, nn.Conv2d):
@@ -135,9 +139,12 @@ class Finetunemodel(nn.Module):
     def __init__(self, weights):
         super(Finetunemodel, self).__init__()
         self.enhance = EnhanceNetwork(layers=1, channels=3)
-        self._criterion = LossFunction()
+        # hàm loss chỉ dùng khi train (_loss) -> tạo khi cần, không import loss_sci
+        # (SmoothLoss cần CUDA) trên đường inference
+        self._criterion = None
 
-        base_weights = torch.load(weights)
+        # weight được lưu từ GPU -> map về CPU để load được trên Pi / máy không CUDA
+        base_weights = torch.load(weights, map_location="cpu")
         pretrained_dict = base_weights
         model_dict = self.state_dict()
         pretrained_dict = {k: v for k, v in pretrained_dict.items() if k in model_dict}
@@ -160,6 +167,8 @@ class Finetunemodel(nn.Module):
 
 
     def _loss(self, input):
+        if self._criterion is None:
+            self._criterion = _make_criterion()
         i, r = self(input)
         loss = self._criterion(input, i)
         return loss
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Bộ lọc chuyển động rẻ tiền đặt trước YOLO: so sánh ảnh xám thu nhỏ của frame
+    hiện tại với frame lần cuối được detect. Ngã tư đứng yên (đèn đỏ, đêm vắng)
+    cho ra các frame gần như giống nhau -> dùng lại kết quả cũ, bỏ qua inference.
+
+    score = tỉ lệ pixel (ảnh nhỏ) lệch hơn `pixel_delta` mức xám so với ảnh tham chiếu.
+    Chỉ detect lại khi score >= threshold, hoặc đã bỏ qua quá `max_skip` giây
+    (để ánh sáng thay đổi chậm / xe đứng yên lâu vẫn được cập nhật).
+    """
+
+    def __init__(self, width=160, threshold=0.01, pixel_delta=20, blur=5, max_skip=10.0,
+                 roi_box=None):
+        self.width = width
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.blur = blur
+        self.max_skip = max_skip
+        # cùng định dạng roi_box của Tienxulyanh.process: [y1, y2, x1, x2] tỉ lệ
+        self.roi_box = roi_box
+
+        self.lock = threading.Lock()
+        self.reference = None
+        self.reference_time = 0.0
+
+        self.checked = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.last_score = None
+        self.total_ms = 0.0
+
+    # ================= FEATURE =================
+
+    def _small_gray(self, frame):
+        if self.roi_box is not None:
+            h, w = frame.shape[:2]
+            y1, y2, x1, x2 = self.roi_box
+            frame = frame[int(h*y1):int(h*y2), int(w*x1):int(w*x2)]
+
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(round(h * self.width / max(w, 1)))))
+
+        # resize trước (ít pixel hơn) rồi mới đổi màu / làm mờ
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self.blur > 1:
+            small = cv2.GaussianBlur(small, (self.blur, self.blur), 0)
+        return small
+
+    # ================= CHECK =================
+
+    def measure(self, frame, now=None):
+        """
+        So frame với ảnh tham chiếu, KHÔNG cập nhật tham chiếu.
+        Trả về (changed, score, feature); feature đưa vào commit() khi frame này
+        đã được detect xong (frame bị bỏ giữa chừng thì tham chiếu giữ nguyên).
+        """
+        t0 = time.perf_counter()
+        now = time.time() if now is None else now
+        small = self._small_gray(frame)
+
+        with self.lock:
+            ref = self.reference
+            if ref is None or ref.shape != small.shape:
+                score = 1.0
+            else:
+                diff = cv2.absdiff(small, ref)
+                score = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+            changed = score >= self.threshold or now - self.reference_time >= self.max_skip
+
+            self.checked += 1
+            self.last_score = score
+            if changed:
+                self.inferred += 1
+            else:
+                self.skipped += 1
+            self.total_ms += (time.perf_counter() - t0) * 1000.0
+
+        return changed, score, (small, now)
+
+    def commit(self, feature):
+        """Lấy frame (feature của measure()) vừa detect xong làm ảnh tham chiếu."""
+        small, now = feature
+        with self.lock:
+            self.reference = small
+            self.reference_time = now
+
+    def check(self, frame, now=None):
+        """
+        Trả về (changed, score). changed=True -> cần chạy YOLO; ảnh tham chiếu được
+        cập nhật ngay theo frame này (dùng khi detect đồng bộ, không bị bỏ giữa chừng).
+        changed=False -> dùng lại kết quả lần trước.
+        """
+        changed, score, feature = self.measure(frame, now)
+        if changed:
+            self.commit(feature)
+        return changed, score
+
+    def reset(self):
+        """Bỏ ảnh tham chiếu -> frame kế tiếp chắc chắn được detect (vd. khi detect lỗi)."""
+        with self.lock:
+            self.reference = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "threshold": self.threshold,
+                "checked": self.checked,
+                "inferred": self.inferred,
+                "skipped": self.skipped,
+                "saved_ratio": round(self.skipped / self.checked, 3) if self.checked else 0.0,
+                "last_score": round(self.last_score, 4) if self.last_score is not None else None,
+                "avg_ms": round(self.total_ms / self.checked, 2) if self.checked else 0.0
+            }
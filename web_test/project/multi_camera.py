@@ -0,0 +1,133 @@
+import threading
+import time
+
+from camera import Camera
+
+
+class MultiCameraDetector:
+    """
+    Nhiều hướng (approach) của nút giao, mỗi hướng 1 Camera
+    (index thiết bị, file video hoặc URL rtsp://...).
+    Mỗi tick: lấy frame mới nhất của từng hướng, letterbox qua Tienxulyanh
+    (cùng target_size) rồi chạy YOLO 1 lần cho cả batch.
+    """
+
+    def __init__(self, sources, pre_proc, ai, target_fps=1.0, roi_box=None,
+                 pre_lock=None, infer_lock=None, thread_init=None):
+        # sources: {"north": 0, "south": "videos/south.mp4", ...}
+        self.cameras = {name: Camera(src=src, thread_init=thread_init) for name, src in sources.items()}
+        # thread_init("multi"): gọi ở đầu thread detect (vd. ghim lõi CPU)
+        self.thread_init = thread_init
+        self.pre_proc = pre_proc
+        self.ai = ai
+        self.target_fps = target_fps
+        self.roi_box = roi_box
+
+        # dùng chung lock với DetectionEngine nếu dùng chung pre_proc / model
+        self.pre_lock = pre_lock or threading.Lock()
+        self.infer_lock = infer_lock or threading.Lock()
+
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.last_ids = {name: 0 for name in self.cameras}
+        self.last_batch_ms = 0.0
+
+        self.running = False
+        self.thread = None
+
+    # ================= TICK =================
+
+    def tick(self):
+        """Chạy 1 batch cho mọi hướng có frame mới. Trả về dict kết quả theo hướng."""
+        names, frames, brightness, frame_ids = [], [], [], []
+
+        for name, cam in self.cameras.items():
+            ref = cam.acquire_new(self.last_ids[name], timeout=0)
+            if ref is None:
+                continue
+
+            with ref:
+                try:
+                    with self.pre_lock:
+                        ready, b = self.pre_proc.process(ref.frame, roi_box=self.roi_box)
+                except Exception as e:
+                    print(f"[MULTI] Lỗi tiền xử lý {name}: {e}")
+                    continue
+
+            self.last_ids[name] = ref.seq
+            names.append(name)
+            frames.append(ready)
+            brightness.append(b)
+            frame_ids.append(ref.seq)
+
+        if not frames:
+            return {}
+
+        t0 = time.perf_counter()
+        with self.infer_lock:
+            outputs = self.ai.detect_batch(frames, brightness)
+        self.last_batch_ms = (time.perf_counter() - t0) * 1000.0
+
+        results = {}
+        for name, frame_id, (res, total) in zip(names, frame_ids, outputs):
+            if res.get("error"):
+                continue
+            res["frame_id"] = frame_id
+            results[name] = res
+
+        with self.lock:
+            self.latest.update(results)
+
+        return results
+
+    def _loop(self):
+        if self.thread_init is not None:
+            self.thread_init("multi")
+
+        period = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+
+        while self.running:
+            t0 = time.perf_counter()
+            if not self.tick():
+                time.sleep(0.05)
+                continue
+
+            elapsed = time.perf_counter() - t0
+            if elapsed < period:
+                time.sleep(period - elapsed)
+
+    # ================= LIFECYCLE =================
+
+    def start(self):
+        if self.running:
+            return
+
+        for cam in self.cameras.values():
+            cam.start()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True, name="multi-camera")
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+        for cam in self.cameras.values():
+            cam.stop()
+
+    # ================= READ RESULT =================
+
+    def get_latest(self):
+        with self.lock:
+            return {name: dict(res) for name, res in self.latest.items()}
+
+    def stats(self):
+        return {
+            "approaches": list(self.cameras.keys()),
+            "connected": {name: cam.is_opened() for name, cam in self.cameras.items()},
+            "target_fps": self.target_fps,
+            "last_batch_ms": round(self.last_batch_ms, 1)
+        }
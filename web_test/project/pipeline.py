@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+
+
+class Stage:
+    """
+    1 bước của pipeline chạy trên 1 thread riêng.
+    fn(item) -> item mới, hoặc None để bỏ item (không đẩy sang bước sau).
+    policy: "drop_oldest" (bỏ item cũ nhất khi queue đầy) hoặc "block" (backpressure).
+    """
+
+    def __init__(self, name, fn, maxsize=1, policy="drop_oldest"):
+        self.name = name
+        self.fn = fn
+        self.policy = policy
+        self.queue = queue.Queue(maxsize=maxsize)
+
+        self.lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def _record(self, ms):
+        with self.lock:
+            self.count += 1
+            self.total_ms += ms
+            self.last_ms = ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def stats(self):
+        with self.lock:
+            avg = self.total_ms / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "queue": self.queue.qsize(),
+                "avg_ms": round(avg, 2),
+                "last_ms": round(self.last_ms, 2),
+                "max_ms": round(self.max_ms, 2)
+            }
+
+
+class Pipeline:
+    """
+    Chuỗi Stage nối bằng queue có giới hạn. Mỗi Stage 1 thread nên
+    throughput tiến tới tốc độ của bước chậm nhất thay vì tổng các bước.
+
+    source(): hàm sinh item đầu vào (vd. đọc camera), None = chưa có.
+    sink(item): nhận item cuối cùng.
+    on_drop(item): gọi khi item bị bỏ do queue đầy (để giải phóng tài nguyên).
+    thread_init(role): gọi ở đầu mỗi thread với tên stage / "capture"
+    (vd. ResourceManager.pin để ghim lõi CPU).
+    """
+
+    def __init__(self, stages, source=None, source_fps=0.0, sink=None, on_drop=None,
+                 thread_init=None):
+        self.stages = stages
+        self.source = source
+        self.source_fps = source_fps
+        self.sink = sink
+        self.on_drop = on_drop
+        self.thread_init = thread_init
+
+        self.source_stage = Stage("capture", None) if source is not None else None
+
+        self.running = False
+        self.threads = []
+
+    # ================= QUEUE =================
+
+    def _put(self, stage, item):
+        if stage.policy == "block":
+            while self.running:
+                try:
+                    stage.queue.put(item, timeout=0.2)
+                    return
+                except queue.Full:
+                    continue
+            self._drop(stage, item)
+            return
+
+        while True:
+            try:
+                stage.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    old = stage.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._drop(stage, old)
+
+    def _drop(self, stage, item):
+        with stage.lock:
+            stage.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def put(self, item):
+        """Đẩy item vào bước đầu tiên (dùng khi không có source)."""
+        self._put(self.stages[0], item)
+
+    # ================= WORKERS =================
+
+    def _run_source(self):
+        if self.thread_init is not None:
+            self.thread_init("capture")
+        period = 1.0 / self.source_fps if self.source_fps > 0 else 0.0
+
+        while self.running:
+            t0 = time.perf_counter()
+
+            try:
+                item = self.source()
+            except Exception as e:
+                print(f"[PIPE] Lỗi capture: {e}")
+                with self.source_stage.lock:
+                    self.source_stage.errors += 1
+                item = None
+
+            if item is None:
+                time.sleep(0.05)
+                continue
+
+            self.source_stage._record((time.perf_counter() - t0) * 1000.0)
+            self._put(self.stages[0], item)
+
+            elapsed = time.perf_counter() - t0
+            if elapsed < period:
+                time.sleep(period - elapsed)
+
+    def _run_stage(self, idx):
+        stage = self.stages[idx]
+        next_stage = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+        if self.thread_init is not None:
+            self.thread_init(stage.name)
+
+        while self.running:
+            try:
+                item = stage.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                out = stage.fn(item)
+            except Exception as e:
+                print(f"[PIPE] Lỗi stage {stage.name}: {e}")
+                with stage.lock:
+                    stage.errors += 1
+                out = None
+            stage._record((time.perf_counter() - t0) * 1000.0)
+
+            if out is None:
+                if self.on_drop is not None:
+                    self.on_drop(item)
+                continue
+
+            if next_stage is not None:
+                self._put(next_stage, out)
+            elif self.sink is not None:
+                self.sink(out)
+
+    def start(self):
+        if self.running:
+            return
+
+        self.running = True
+        self.threads = []
+
+        for idx, stage in enumerate(self.stages):
+            t = threading.Thread(target=self._run_stage, args=(idx,), daemon=True,
+                                 name=f"pipe-{stage.name}")
+            t.start()
+            self.threads.append(t)
+
+        if self.source is not None:
+            t = threading.Thread(target=self._run_source, daemon=True, name="pipe-capture")
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.running = False
+
+        for t in self.threads:
+            t.join(timeout=1.0)
+        self.threads = []
+
+    # ================= STATS =================
+
+    def stats(self):
+        stages = list(self.stages)
+        if self.source_stage is not None:
+            stages = [self.source_stage] + stages
+
+        out = {s.name: s.stats() for s in stages}
+
+        # throughput lý thuyết bị giới hạn bởi stage chậm nhất
+        slowest = max(stages, key=lambda s: s.stats()["avg_ms"], default=None)
+        out["bottleneck"] = slowest.name if slowest is not None else None
+        return out
@@ -1,35 +1,88 @@
 import cv2
+import math
 import numpy as np
-import torch
-import os
-from PIL import Image
-import torchvision.transforms as transforms
-from model_sci import Finetunemodel
+import threading
+import time
 
 
 class Tienxulyanh:
-    def __init__(self, target_size=(640, 640), use_sci=True):
+    def __init__(self, target_size=(640, 640), use_sci=True, rect=False, stride=32,
+                 canvas_pool=4, pad_color=(114, 114, 114),
+                 brightness_mode="fast", brightness_step=4, brightness_ema=0.5,
+                 enhance_threshold=0.4, day_night=None, enhance_mode="roi", sci_scale=0.5,
+                 lut_path=None, enhance_budget_ms=None, enhance_probe_every=50,
+                 enhancers=None, dce_scale=4):
         self.target_size = target_size
         self.use_sci = use_sci
         self.brightness = 0.0
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-        self.transform = transforms.ToTensor()
-
-        if self.use_sci:
-            try:
-                model_path = "SCI/CVPR/weights/medium.pt"
-
-                if os.path.exists(model_path):
-                    self.sci_net = Finetunemodel(model_path).to(self.device).eval()
-                    print(f"✅ Loaded SCI model trên {self.device}")
-                else:
-                    print(f"⚠️ Không tìm thấy weight tại {model_path}")
-                    self.use_sci = False
-
-            except Exception as e:
-                print(f"⚠️ Lỗi load SCI model: {e}")
-                self.use_sci = False
+        # "hsv": mean kênh V của cả ROI (cách cũ, cấp phát ảnh HSV mỗi frame)
+        # "fast": V = max(B, G, R) trên lưới lấy mẫu cách brightness_step pixel
+        self.brightness_mode = brightness_mode
+        self.brightness_step = brightness_step
+        # hệ số EMA giữa các frame liên tiếp của camera (0 = không làm mượt)
+        self.brightness_ema = brightness_ema
+        self.brightness_smooth = None
+
+        # ảnh lẻ: bật tăng sáng khi brightness < enhance_threshold.
+        # luồng camera: DayNightSwitch (ngưỡng trễ + thời gian giữ) nếu có
+        self.enhance_threshold = enhance_threshold
+        self.day_night = day_night
+
+        # "roi":       tăng sáng ROI độ phân giải gốc rồi mới letterbox (cách cũ)
+        # "letterbox": letterbox trước, tăng sáng ảnh cỡ YOLO (không tính phần viền)
+        # "lowres":    như "letterbox", SCI ước lượng illumination trên ảnh thu nhỏ
+        #              sci_scale lần rồi phóng lại để chia (r = I / illu)
+        self.enhance_mode = enhance_mode
+        self.sci_scale = sci_scale
+
+        # Tăng sáng ban đêm: enhancers = danh sách theo thứ tự ưu tiên (tốt -> rẻ)
+        # trong "sci" / "lut" / "zerodce" / "none" (xem enhancers.py).
+        # Mặc định suy từ use_sci / lut_path như trước. Dict {name: Enhancer} = đã load sẵn.
+        # enhance_budget_ms: chọn bộ đầu tiên có thời gian đo được (EMA) <= ngân sách,
+        # bộ đắt hơn được đo lại mỗi enhance_probe_every frame đêm. None = luôn dùng bộ đầu.
+        self.enhance_budget_ms = enhance_budget_ms
+        self.enhance_probe_every = enhance_probe_every
+        self.enhance_ms = {}
+        self.enhance_count = {}
+        self.last_enhance = None
+        self.night_frames = 0
+
+        # rect=True: không pad thành hình vuông, chỉ pad tới bội số của stride
+        # (ROI 640x384 -> YOLO xử lý 640x384 thay vì 640x640)
+        self.rect = rect
+        self.stride = stride
+        self.pad_color = pad_color
+        # canvas letterbox cấp phát sẵn theo kích thước. Canvas được "mượn" tới khi
+        # caller gọi release_canvas() (vd. YOLO đọc xong / item bị pipeline bỏ) nên
+        # không bị ghi đè khi còn dùng; hết canvas rảnh thì cấp thêm (canvas_pool = số ban đầu)
+        self.canvas_pool = canvas_pool
+        self.canvases = {}
+        self.canvas_lock = threading.Lock()
+        self.device = None
+
+        if enhancers is None:
+            enhancers = (["sci"] if use_sci else []) + (["lut"] if lut_path else [])
+
+        if isinstance(enhancers, dict):
+            # đã load sẵn (ModelRegistry) -> dùng chung, không load lại weight
+            self.set_enhancers(enhancers)
+        else:
+            # torch chỉ bị import khi thật sự load model ở đây
+            import torch
+            from enhancers import build_enhancers
+
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            self.set_enhancers(build_enhancers(
+                enhancers, device=self.device,
+                sci_lowres=enhance_mode == "lowres", sci_scale=sci_scale,
+                lut_path=lut_path, dce_scale=dce_scale
+            ))
+
+    def set_enhancers(self, enhancers):
+        """Gắn bộ tăng sáng {name: Enhancer} (vd. sau khi ModelRegistry load xong ở thread nền)."""
+        self.enhancers = dict(enhancers)
+        self.use_sci = "sci" in self.enhancers
 
     # ================= LETTERBOX =================
 
@@ -55,39 +108,166 @@ class Tienxulyanh:
             cv2.BORDER_CONSTANT, value=color
         )
 
-    # ================= BRIGHTNESS =================
-
-    def _calculate_brightness(self, frame):
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        return np.mean(hsv[:, :, 2]) / 255.0
-
-    # ================= SCI ENHANCE =================
+    def _canvas_shape(self, unpad_hw):
+        new_h, new_w = self.target_size
+        if not self.rect:
+            return new_h, new_w
+        h, w = unpad_hw
+        return (int(math.ceil(h / self.stride) * self.stride),
+                int(math.ceil(w / self.stride) * self.stride))
+
+    def _next_canvas(self, key, reuse):
+        if not reuse:
+            return np.empty(key, np.uint8)
+
+        with self.canvas_lock:
+            slot = self.canvases.get(key)
+            if slot is None:
+                slot = self.canvases[key] = {
+                    "bufs": [np.empty(key, np.uint8) for _ in range(self.canvas_pool)],
+                    "busy": set()
+                }
+
+            for idx, buf in enumerate(slot["bufs"]):
+                if idx not in slot["busy"]:
+                    break
+            else:
+                # mọi canvas đang được mượn -> cấp thêm thay vì ghi đè
+                slot["bufs"].append(np.empty(key, np.uint8))
+                idx, buf = len(slot["bufs"]) - 1, slot["bufs"][-1]
+
+            slot["busy"].add(idx)
+            return buf
+
+    def release_canvas(self, canvas):
+        """Trả canvas (ảnh letterbox của reuse=True) về pool, gọi khi không còn đọc nó."""
+        if canvas is None:
+            return
+        with self.canvas_lock:
+            slot = self.canvases.get(canvas.shape)
+            if slot is None:
+                return
+            for idx, buf in enumerate(slot["bufs"]):
+                if buf is canvas:
+                    slot["busy"].discard(idx)
+                    return
+
+    def letterbox_into(self, img, reuse=True):
+        """
+        Resize img thẳng vào canvas cấp phát sẵn (không copyMakeBorder / cấp phát mới),
+        canvas được mượn tới khi release_canvas(canvas).
+        reuse=False: canvas mới (khi caller giữ nhiều ảnh cùng lúc, vd. batch nhiều camera).
+        Trả về (canvas, ratio, (pad_x, pad_y)).
+        """
+        shape = img.shape[:2]
+        new_h, new_w = self.target_size
 
-    def _apply_sci(self, frame):
-        try:
-            # Convert BGR → RGB
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        r = min(new_h / shape[0], new_w / shape[1])
+        unpad_w, unpad_h = int(round(shape[1] * r)), int(round(shape[0] * r))
 
-            # Convert sang PIL giống MemoryFriendlyLoader
-            pil_img = Image.fromarray(rgb)
+        canvas_h, canvas_w = self._canvas_shape((unpad_h, unpad_w))
+        canvas = self._next_canvas((canvas_h, canvas_w) + img.shape[2:], reuse)
 
-            # ToTensor giống dataset của bạn
-            tensor = self.transform(pil_img).unsqueeze(0).to(self.device)
+        top = int(round((canvas_h - unpad_h) / 2 - 0.1))
+        left = int(round((canvas_w - unpad_w) / 2 - 0.1))
+        bottom, right = top + unpad_h, left + unpad_w
 
-            with torch.no_grad():
-                _, r = self.sci_net(tensor)
+        # chỉ tô lại phần viền, phần giữa được resize ghi đè
+        color = self.pad_color if img.ndim == 3 else self.pad_color[0]
+        canvas[:top] = color
+        canvas[bottom:] = color
+        canvas[top:bottom, :left] = color
+        canvas[top:bottom, right:] = color
 
-            enhanced = r[0].permute(1, 2, 0).cpu().numpy()
-            enhanced = np.clip(enhanced, 0, 1)
-            enhanced = (enhanced * 255).astype(np.uint8)
+        view = canvas[top:bottom, left:right]
+        if (unpad_h, unpad_w) == shape:
+            view[...] = img
+        else:
+            cv2.resize(img, (unpad_w, unpad_h), dst=view, interpolation=cv2.INTER_LINEAR)
 
-            enhanced_bgr = cv2.cvtColor(enhanced, cv2.COLOR_RGB2BGR)
+        return canvas, r, (left, top)
 
-            return enhanced_bgr
+    # ================= BRIGHTNESS =================
 
-        except Exception as e:
-            print(f"⚠️ Lỗi xử lý SCI: {e}")
-            return frame
+    def _calculate_brightness(self, frame):
+        if self.brightness_mode == "hsv":
+            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+            return np.mean(hsv[:, :, 2]) / 255.0
+
+        # kênh V của HSV chính là max(B, G, R) -> không cần đổi hệ màu cả ảnh.
+        # Lấy mẫu 1/step pixel bằng resize NEAREST (SIMD, ảnh nhỏ liền bộ nhớ)
+        step = self.brightness_step
+        h, w = frame.shape[:2]
+        sample = cv2.resize(frame, (max(1, w // step), max(1, h // step)),
+                            interpolation=cv2.INTER_NEAREST)
+        if sample.ndim == 3:
+            b, g, r = cv2.split(sample)
+            sample = cv2.max(cv2.max(b, g), r)
+        return cv2.mean(sample)[0] / 255.0
+
+    def _smooth_brightness(self, value):
+        alpha = self.brightness_ema
+        if alpha <= 0 or self.brightness_smooth is None:
+            self.brightness_smooth = value
+        else:
+            self.brightness_smooth = alpha * value + (1.0 - alpha) * self.brightness_smooth
+        return self.brightness_smooth
+
+    # ================= ENHANCE POLICY =================
+
+    def _choose_enhancer(self):
+        candidates = list(self.enhancers)
+        if not candidates:
+            return "none"
+        if self.enhance_budget_ms is None:
+            return candidates[0]
+
+        self.night_frames += 1
+        probe = self.night_frames % self.enhance_probe_every == 0
+        for method in candidates:
+            cost = self.enhance_ms.get(method)
+            if cost is None or cost <= self.enhance_budget_ms or probe:
+                return method
+        return "none"
+
+    def _enhance(self, frame, out=None):
+        """Tăng sáng frame theo cách được chọn, trả về (ảnh, cách). out: ghi tại chỗ."""
+        method = self._choose_enhancer()
+        t0 = time.perf_counter()
+
+        enhancer = self.enhancers.get(method)
+        if enhancer is None:
+            res = frame if out is None else out
+        else:
+            try:
+                res = enhancer.apply(frame, self.brightness, out=out)
+            except Exception as e:
+                print(f"⚠️ Lỗi tăng sáng {method}: {e}")
+                res = frame if out is None else out
+
+        ms = (time.perf_counter() - t0) * 1000.0
+        prev = self.enhance_ms.get(method)
+        self.enhance_ms[method] = ms if prev is None else 0.3 * ms + 0.7 * prev
+        self.enhance_count[method] = self.enhance_count.get(method, 0) + 1
+        self.last_enhance = method
+        return res, method
+
+    def _enhance_inplace(self, canvas, ratio, pad, roi_shape):
+        # chỉ vùng ảnh thật trong canvas, bỏ phần viền pad
+        left, top = pad
+        h, w = int(round(roi_shape[0] * ratio)), int(round(roi_shape[1] * ratio))
+        view = canvas[top:top + h, left:left + w]
+
+        _, method = self._enhance(view, out=view)
+        return method
+
+    def enhance_stats(self):
+        return {
+            "budget_ms": self.enhance_budget_ms,
+            "last": self.last_enhance,
+            "avg_ms": {m: round(v, 1) for m, v in self.enhance_ms.items()},
+            "count": dict(self.enhance_count)
+        }
 
     # ================= MAIN PROCESS =================
 
@@ -95,23 +275,65 @@ class Tienxulyanh:
         if frame is None:
             return None, 0.0
 
+        frame, brightness, _ = self.process_with_meta(frame, roi_box, reuse=False)
+        return frame, brightness
+
+    def process_with_meta(self, frame, roi_box=None, reuse=True, smooth=False):
+        """
+        Như process() nhưng ảnh được letterbox vào canvas dùng lại (reuse=True),
+        kèm meta để quy box trên ảnh YOLO về toạ độ frame gốc:
+            meta = {"ratio", "pad": (x, y), "roi_offset": (x, y), "source_shape": (h, w)}
+        reuse=True: canvas được mượn từ pool, caller phải release_canvas(ảnh) khi dùng xong.
+        smooth=True: độ sáng được làm mượt EMA qua các frame (luồng camera)
+        và chế độ ngày / đêm đi qua day_night; meta["light_mode"] = "day" / "night".
+        """
+        if frame is None:
+            return None, 0.0, None
+
+        source_shape = frame.shape[:2]
+        offset = (0, 0)
+
         # 1️⃣ Crop ROI
         if roi_box is not None:
             h, w = frame.shape[:2]
             y1, y2, x1, x2 = roi_box
+            offset = (int(w*x1), int(h*y1))
             frame = frame[int(h*y1):int(h*y2), int(w*x1):int(w*x2)]
 
         # 2️⃣ Brightness
         self.brightness = self._calculate_brightness(frame)
-
-        # 3️⃣ SCI
-        if self.use_sci and self.brightness < 0.4:
-            frame = self._apply_sci(frame)
-
-        # 4️⃣ Letterbox cho YOLO
-        frame = self.letterbox(frame, self.target_size)
-
-        return frame, self.brightness
+        if smooth:
+            self.brightness = self._smooth_brightness(self.brightness)
+
+        # 3️⃣ Tăng sáng (chế độ đêm)
+        if smooth and self.day_night is not None:
+            light_mode = self.day_night.update(self.brightness)
+        else:
+            light_mode = "night" if self.brightness < self.enhance_threshold else "day"
+
+        night = light_mode == "night" and bool(self.enhancers)
+        enhance = None
+        if night and self.enhance_mode == "roi":
+            frame, enhance = self._enhance(frame)
+
+        # 4️⃣ Letterbox cho YOLO (vào canvas cấp phát sẵn)
+        roi_shape = frame.shape[:2]
+        frame, ratio, pad = self.letterbox_into(frame, reuse=reuse)
+
+        # tăng sáng sau letterbox: chạy trên ảnh cỡ YOLO thay vì ROI gốc
+        if night and self.enhance_mode != "roi":
+            enhance = self._enhance_inplace(frame, ratio, pad, roi_shape)
+
+        meta = {
+            "ratio": ratio,
+            "pad": pad,
+            "roi_offset": offset,
+            "roi_shape": roi_shape,
+            "source_shape": source_shape,
+            "light_mode": light_mode,
+            "enhance": enhance
+        }
+        return frame, self.brightness, meta
 
     # ================= PROCESS FILE =================
 
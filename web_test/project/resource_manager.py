@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+
+import cv2
+
+
+# ==========================================================
+# Chia lõi CPU cho các thread của service (Pi 5: 4 lõi 0-3).
+# Mỗi thread gọi pin(role) khi bắt đầu chạy để tự ghim vào lõi của vai trò:
+#   "camera"     - thread đọc Camera
+#   "capture"    - thread lấy frame của pipeline detect
+#   "preprocess" - ROI + letterbox + tăng sáng (SCI chạy torch ở đây)
+#   "infer"      - YOLO (và thread load model: pool thread của ONNX Runtime /
+#                  OpenMP được tạo ở thread đó và kế thừa affinity của nó)
+#   "store"      - giữ kết quả / ảnh cho DetectionStore
+#   "encode"     - encode JPEG cho MJPEG stream
+#   "multi"      - vòng detect nhiều camera
+# Số thread của torch / OpenCV là cấu hình chung của cả process. Mặc định pool
+# thread không lớn hơn số lõi được ghim của nơi thư viện thật sự chạy:
+# ONNX Runtime (YOLO) theo "infer"; torch theo "infer" nếu YOLO chạy torch,
+# không thì theo "preprocess" (torch chỉ còn chạy SCI / Zero-DCE ở đó).
+# So sánh các cách chia: Rasp_affinity.py
+# ==========================================================
+
+class ResourceManager:
+    def __init__(self, plan=None, torch_threads=None, cv2_threads=None, ort_threads=None):
+        # plan: {role: [cpu, ...]}, role không có trong plan = không ghim
+        # ort_threads = None: số lõi "infer"; torch_threads = None: theo backend YOLO
+        # (xem apply_threads). Role không ghim -> để mặc định của thư viện
+        self.available = self._available()
+        self.plan = {}
+        for role, cpus in (plan or {}).items():
+            usable = set(cpus) & self.available if self.available else set(cpus)
+            if usable:
+                self.plan[role] = sorted(usable)
+            else:
+                print(f"[CPU] Bỏ qua {role}: không có lõi nào trong {cpus} khả dụng")
+
+        self.torch_threads = torch_threads
+        self.ort_threads = ort_threads if ort_threads is not None else self.role_threads("infer")
+        self.cv2_threads = cv2_threads
+
+        self.lock = threading.Lock()
+        self.pinned = {}
+
+    @staticmethod
+    def _available():
+        # sched_setaffinity chỉ có trên Linux
+        if not hasattr(os, "sched_getaffinity"):
+            return set()
+        return set(os.sched_getaffinity(0))
+
+    def role_threads(self, role):
+        """Số lõi được ghim cho role, None nếu role không ghim."""
+        return len(self.plan.get(role, ())) or None
+
+    # ================= PROCESS =================
+
+    def apply_threads(self, backend=None):
+        """
+        Đặt số thread torch / OpenCV (torch chỉ khi đã được import).
+        backend: backend YOLO thực tế (sau khi load model); torch_threads=None thì
+        torch lấy số lõi "infer" nếu backend là "torch", không thì số lõi "preprocess".
+        ONNX Runtime đặt theo session: ModelRegistry(ort_threads=...).
+        """
+        if self.cv2_threads is not None:
+            cv2.setNumThreads(int(self.cv2_threads))
+
+        torch_threads = self.torch_threads
+        if torch_threads is None and backend is not None:
+            torch_threads = self.role_threads("infer" if backend == "torch" else "preprocess")
+
+        if torch_threads is not None:
+            # không tự import torch (app load torch ở thread nền)
+            torch = sys.modules.get("torch")
+            if torch is not None:
+                torch.set_num_threads(int(torch_threads))
+        return self
+
+    # ================= THREAD =================
+
+    def pin(self, role):
+        """Ghim thread đang chạy vào lõi của role (gọi ở đầu hàm của thread)."""
+        cpus = self.plan.get(role)
+        if not cpus or not hasattr(os, "sched_setaffinity"):
+            return
+
+        try:
+            # pid 0 = thread gọi hàm (Linux tính affinity theo từng thread)
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"[CPU] Không ghim được {role} vào {cpus}: {e}")
+            return
+
+        with self.lock:
+            self.pinned[threading.current_thread().name] = {"role": role, "cpus": cpus}
+
+    def stats(self):
+        torch = sys.modules.get("torch")
+        torch_threads = torch.get_num_threads() if torch is not None else None
+
+        with self.lock:
+            pinned = dict(self.pinned)
+        return {
+            "available": sorted(self.available),
+            "plan": dict(self.plan),
+            "pinned": pinned,
+            "torch_threads": torch_threads,
+            "ort_threads": self.ort_threads,
+            "cv2_threads": cv2.getNumThreads()
+        }
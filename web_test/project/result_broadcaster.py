@@ -0,0 +1,95 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+
+class ResultBroadcaster:
+    """
+    Kênh đẩy kết quả detect tới trình duyệt (Server-Sent Events) thay cho
+    việc ghi static/last_detection.json rồi để JS polling.
+
+    - Flask (thread): wait(after_seq, timeout) chờ bằng condition variable.
+    - Quart (asyncio): subscribe_async() nhận asyncio.Queue, publish() đẩy vào
+      qua loop.call_soon_threadsafe nên gọi được từ bất kỳ thread nào.
+    Mỗi gói có tên event riêng (vd. "detection" / "suggestion") để trình duyệt
+    chỉ xử lý loại nó cần; item = (seq, event, json).
+    """
+
+    def __init__(self, queue_size=4, history=16):
+        self.queue_size = queue_size
+        self.cond = threading.Condition()
+        self.seq = 0
+        # bản mới nhất của từng event + vài gói gần nhất cho client Flask
+        self.last = {}
+        self.history = deque(maxlen=history)
+
+        self.async_subscribers = []
+
+    # ================= PUBLISH =================
+
+    def publish(self, payload, event="detection"):
+        data = json.dumps(payload, ensure_ascii=False)
+
+        with self.cond:
+            self.seq += 1
+            self.last[event] = data
+            item = (self.seq, event, data)
+            self.history.append(item)
+            subscribers = list(self.async_subscribers)
+            self.cond.notify_all()
+
+        for loop, q in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, q, item)
+            except RuntimeError:
+                # event loop đã đóng
+                self.unsubscribe_async(q)
+
+    @staticmethod
+    def _offer(q, item):
+        # client chậm -> bỏ bản cũ nhất, luôn giữ kết quả mới
+        if q.full():
+            try:
+                q.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        q.put_nowait(item)
+
+    # ================= SUBSCRIBE =================
+
+    def latest(self, event="detection"):
+        """(seq hiện tại, json mới nhất của event hoặc None) - client mới chờ tiếp từ seq này."""
+        with self.cond:
+            return self.seq, self.last.get(event)
+
+    def wait(self, after_seq=0, timeout=None):
+        """
+        Chờ gói có seq > after_seq. Trả list (seq, event, json) còn trong history
+        (cũ -> mới), hoặc None nếu hết timeout.
+        """
+        with self.cond:
+            ok = self.cond.wait_for(lambda: self.seq > after_seq, timeout=timeout)
+            if not ok:
+                return None
+            return [item for item in self.history if item[0] > after_seq]
+
+    def subscribe_async(self):
+        q = asyncio.Queue(maxsize=self.queue_size)
+        with self.cond:
+            self.async_subscribers.append((asyncio.get_running_loop(), q))
+        return q
+
+    def unsubscribe_async(self, q):
+        with self.cond:
+            self.async_subscribers = [(l, s) for l, s in self.async_subscribers if s is not q]
+
+    def subscribers(self):
+        with self.cond:
+            return len(self.async_subscribers)
+
+    # ================= SSE =================
+
+    @staticmethod
+    def format_sse(seq, data, event="detection"):
+        return f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
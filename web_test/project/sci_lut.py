@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+
+class SciLUT:
+    """
+    Xấp xỉ SCI bằng bảng tra (tone curve) theo từng mức độ sáng.
+
+    Finetunemodel chỉ là 1 khối conv + r = I / illu, nên với mỗi mức độ sáng của
+    ảnh, quan hệ giá trị vào -> ra của từng kênh gần như là 1 đường cong cố định.
+    lut có shape (levels, 256, 3): levels mức độ sáng trong [0, 1), mỗi mức 1
+    đường cong / kênh BGR, áp bằng cv2.LUT (O(số pixel), không cần torch).
+    """
+
+    def __init__(self, lut):
+        self.lut = np.ascontiguousarray(lut, dtype=np.uint8)
+        if self.lut.ndim != 3 or self.lut.shape[1:] != (256, 3):
+            raise ValueError("lut phải có shape (levels, 256, 3)")
+        self.levels = self.lut.shape[0]
+        # cv2.LUT nhận bảng (1, 256, 3) cho ảnh 3 kênh
+        self.tables = [self.lut[i].reshape(1, 256, 3) for i in range(self.levels)]
+
+    # ================= APPLY =================
+
+    def level(self, brightness):
+        return min(max(int(brightness * self.levels), 0), self.levels - 1)
+
+    def apply(self, frame, brightness, out=None):
+        """frame BGR uint8 -> ảnh đã tăng sáng, ghi vào out nếu có (có thể là chính frame)."""
+        table = self.tables[self.level(brightness)]
+        if out is None:
+            return cv2.LUT(frame, table)
+        # LUT từng pixel độc lập -> ghi tại chỗ được (kể cả view trong canvas)
+        return cv2.LUT(frame, table, dst=out)
+
+    # ================= SAVE / LOAD =================
+
+    def save(self, path):
+        np.savez_compressed(path, lut=self.lut)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["lut"])
+
+
+class SciLUTFitter:
+    """
+    Gom cặp (ảnh gốc, ảnh SCI) rồi fit SciLUT: với mỗi mức độ sáng và mỗi kênh,
+    giá trị ra = trung bình giá trị SCI của mọi pixel có cùng giá trị vào.
+    Mức / giá trị không có dữ liệu được nội suy, đường cong ép đơn điệu tăng.
+    """
+
+    def __init__(self, levels=8):
+        self.levels = levels
+        self.sums = np.zeros((levels, 256, 3), np.float64)
+        self.counts = np.zeros((levels, 256, 3), np.float64)
+
+    def add(self, frame, enhanced, brightness):
+        level = min(max(int(brightness * self.levels), 0), self.levels - 1)
+        for c in range(3):
+            src = frame[:, :, c].ravel()
+            dst = enhanced[:, :, c].ravel().astype(np.float64)
+            self.sums[level, :, c] += np.bincount(src, weights=dst, minlength=256)
+            self.counts[level, :, c] += np.bincount(src, minlength=256)
+
+    def fit(self):
+        x = np.arange(256, dtype=np.float64)
+        lut = np.full((self.levels, 256, 3), np.nan)
+
+        for level in range(self.levels):
+            for c in range(3):
+                seen = self.counts[level, :, c] > 0
+                if seen.sum() < 2:
+                    continue
+                curve = self.sums[level, seen, c] / self.counts[level, seen, c]
+                curve = np.interp(x, x[seen], curve)
+                lut[level, :, c] = np.maximum.accumulate(curve)
+
+        # mức độ sáng không có ảnh nào -> lấy mức gần nhất đã fit
+        fitted = [i for i in range(self.levels) if not np.isnan(lut[i]).any()]
+        if not fitted:
+            raise RuntimeError("Không có dữ liệu để fit LUT")
+        for level in range(self.levels):
+            if level not in fitted:
+                nearest = min(fitted, key=lambda i: abs(i - level))
+                lut[level] = lut[nearest]
+
+        return SciLUT(np.clip(np.round(lut), 0, 255).astype(np.uint8))
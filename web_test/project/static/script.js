@@ -116,15 +116,17 @@ function handleCaptureResponse(data) {
     }
     updateDensity(totalCount);
 
-    // ----------- Ảnh gốc -----------  
-    if (data.input_image) {
-        originalImg.src = data.input_image;
+    // ----------- Ảnh gốc (URL render theo yêu cầu, hoặc base64 kiểu cũ) -----------  
+    const inputSrc = data.input_image_url || data.input_image;
+    if (inputSrc) {
+        originalImg.src = inputSrc;
         originalImg.classList.add("active");
     }
 
     // ----------- Ảnh detect -----------  
-    if (data.processed_image) {
-        showProcessedImage(data.processed_image);
+    const processedSrc = data.processed_image_url || data.processed_image;
+    if (processedSrc) {
+        showProcessedImage(processedSrc);
     }
 
     // ----------- Thời gian đèn -----------
@@ -194,8 +196,9 @@ function startCamera() {
 window.addEventListener("DOMContentLoaded", () => {
     // Chỉ hiển thị camera – KHÔNG tự detect
     startCamera();
-    // Bắt đầu polling file last_detection.json để cập nhật ảnh khi có detect từ UART
-    startLastDetectionPolling();
+    // Nhận kết quả detect đã gửi đèn (UART) qua SSE,
+    // tự chuyển sang polling /last_detection nếu server không hỗ trợ
+    startDetectionEvents();
 });
 
 // ==============================================
@@ -241,15 +244,53 @@ form.addEventListener("submit", async (e) => {
 });
 
 // ==========================
-// Polling last_detection.json
+// Server-Sent Events (/events)
+// ==========================
+let detectionEvents = null;
+
+function startDetectionEvents() {
+    if (!window.EventSource) {
+        startLastDetectionPolling();
+        return;
+    }
+
+    detectionEvents = new EventSource("/events");
+
+    // Chỉ nghe event "detection" (kết quả đã gửi đèn). Event "suggestion" của
+    // vòng detect nền bị bỏ qua để không ghi đè ảnh / số xe / thời gian đèn
+    // của lần chụp hoặc upload đang xem.
+    detectionEvents.addEventListener("detection", (e) => {
+        try {
+            const data = JSON.parse(e.data);
+            if (!data || !data.timestamp) return;
+            if (data.timestamp >= lastDetectionTimestamp) {
+                lastDetectionTimestamp = data.timestamp;
+                handleCaptureResponse(data);
+            }
+        } catch (err) {
+            // bỏ qua gói lỗi
+        }
+    });
+
+    detectionEvents.onerror = () => {
+        // EventSource tự kết nối lại; chỉ fallback khi server đóng hẳn (vd. 404)
+        if (detectionEvents.readyState === EventSource.CLOSED) {
+            detectionEvents = null;
+            startLastDetectionPolling();
+        }
+    };
+}
+
+// ==========================
+// Polling /last_detection (fallback)
 // ==========================
 let lastDetectionTimestamp = 0;
 let lastPollInterval = null;
 
 async function pollLastDetection() {
     try {
-        const res = await fetch(noCache('/static/last_detection.json'));
-        if (!res.ok) return;
+        const res = await fetch(noCache('/last_detection'));
+        if (!res.ok || res.status === 204) return;
         const data = await res.json();
         if (!data || !data.timestamp) return;
         if (data.timestamp > lastDetectionTimestamp) {
@@ -258,7 +299,7 @@ async function pollLastDetection() {
             handleCaptureResponse(data);
         }
     } catch (e) {
-        // ignore fetch errors (file may not exist yet)
+        // ignore fetch errors (server đang khởi động / chưa có kết quả)
     }
 }
 
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import cv2
+
+
+class StreamEncoder:
+    """
+    Encode JPEG dùng chung cho /camera_stream: mỗi frame mới của Camera chỉ
+    được encode 1 lần (theo frame id) rồi phát cho mọi client đang xem.
+    Thread encode chỉ chạy khi có ít nhất 1 subscriber.
+    """
+
+    def __init__(self, cam, quality=80, scale=1.0, max_fps=15.0, thread_init=None):
+        self.cam = cam
+        self.quality = quality
+        self.scale = scale
+        self.max_fps = max_fps
+        # thread_init("encode"): gọi ở đầu thread encode (vd. ghim lõi CPU)
+        self.thread_init = thread_init
+
+        self.cond = threading.Condition()
+        self.subscribers = 0
+        self.frame_id = 0
+        self.chunk = None
+
+        self.encoded = 0
+        self.total_ms = 0.0
+
+        self.running = False
+        self.thread = None
+
+    # ================= SUBSCRIBE =================
+
+    def subscribe(self):
+        with self.cond:
+            self.subscribers += 1
+            self.cond.notify_all()
+        self.start()
+
+    def unsubscribe(self):
+        with self.cond:
+            self.subscribers = max(0, self.subscribers - 1)
+
+    # ================= ENCODER THREAD =================
+
+    def start(self):
+        with self.cond:
+            if self.running:
+                return
+            self.running = True
+
+        self.thread = threading.Thread(target=self._loop, daemon=True, name="stream-encoder")
+        self.thread.start()
+
+    def _encode(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            return None
+
+        # ghép sẵn header multipart để mỗi client chỉ việc gửi bytes
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' +
+                jpeg.tobytes() + b'\r\n')
+
+    def _loop(self):
+        if self.thread_init is not None:
+            self.thread_init("encode")
+
+        period = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        last_id = 0
+        last_time = 0.0
+
+        while self.running:
+            with self.cond:
+                if self.subscribers == 0:
+                    # không ai xem -> không encode
+                    self.cond.wait(timeout=1.0)
+                    continue
+
+            # giới hạn FPS stream: chờ đủ chu kỳ rồi mới lấy frame mới nhất
+            wait = period - (time.perf_counter() - last_time)
+            if wait > 0:
+                time.sleep(wait)
+
+            ref = self.cam.acquire_new(last_id, timeout=1.0)
+            if ref is None:
+                continue
+
+            t0 = time.perf_counter()
+            with ref:
+                last_id = ref.seq
+                chunk = self._encode(ref.frame)
+            last_time = t0
+
+            if chunk is None:
+                continue
+
+            with self.cond:
+                self.frame_id = last_id
+                self.chunk = chunk
+                self.encoded += 1
+                self.total_ms += (time.perf_counter() - t0) * 1000.0
+                self.cond.notify_all()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    # ================= READ =================
+
+    def wait_chunk(self, after_id=0, timeout=1.0):
+        """
+        Chờ ảnh đã encode có frame id > after_id.
+        Trả (frame_id, chunk multipart) hoặc None nếu hết timeout.
+        """
+        with self.cond:
+            ok = self.cond.wait_for(
+                lambda: self.chunk is not None and self.frame_id > after_id,
+                timeout=timeout
+            )
+            if not ok:
+                return None
+            return self.frame_id, self.chunk
+
+    def latest_chunk(self):
+        """(frame_id, chunk) mới nhất, không chờ (dùng cho vòng asyncio)."""
+        with self.cond:
+            return self.frame_id, self.chunk
+
+    def stats(self):
+        with self.cond:
+            avg = self.total_ms / self.encoded if self.encoded else 0.0
+            return {
+                "subscribers": self.subscribers,
+                "encoded": self.encoded,
+                "frame_id": self.frame_id,
+                "avg_encode_ms": round(avg, 2),
+                "quality": self.quality,
+                "scale": self.scale,
+                "max_fps": self.max_fps
+            }
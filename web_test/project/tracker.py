@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """IoU giữa mọi cặp box a (M, 4) và b (N, 4) dạng xyxy -> (M, N)."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+class VehicleTracker:
+    """
+    Tracker IoU + bộ lọc alpha-beta (Kalman trạng thái dừng, vận tốc không đổi),
+    toàn bộ trạng thái lưu trong mảng NumPy nên chạy được ở FPS camera trên CPU Pi.
+
+    Ở tần số detect thấp (DETECT_FPS = 2 -> 0.5s / lần) box của xe đang chạy không
+    còn chồng lên nhau giữa 2 lần detect: cặp track / box chưa khớp IoU được ghép
+    tiếp theo khoảng cách tâm (<= max_speed * dt, kích thước box tương đương),
+    và lần khớp thứ 2 của track lấy thẳng vận tốc đo được làm vận tốc ban đầu.
+
+    Gán ID cố định cho từng xe qua các lần detect để:
+        - đếm số xe KHÁC NHAU trong 1 khoảng thời gian (không đếm lại xe đứng chờ)
+        - đo chiều dài hàng chờ (xe đã xác nhận gần như đứng yên)
+        - đo thời gian xe ở trong khung hình (dwell time)
+    """
+
+    def __init__(self, class_names, iou_threshold=0.3, max_age=2.0, min_hits=2,
+                 stop_speed=8.0, alpha=0.6, beta=0.2, history=600.0,
+                 max_speed=400.0, max_size_ratio=2.0):
+        self.class_names = class_names
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age            # giây mất dấu trước khi xoá track
+        self.min_hits = min_hits          # số lần khớp để xác nhận là xe thật
+        self.stop_speed = stop_speed      # px/s, chậm hơn -> coi như đang dừng
+        self.alpha = alpha
+        self.beta = beta
+        self.history = history            # giây giữ lịch sử cho thống kê
+        self.max_speed = max_speed        # px/s, tâm box đi xa hơn max_speed * dt -> xe khác
+        self.max_size_ratio = max_size_ratio  # tỉ lệ diện tích tối đa giữa 2 box được ghép
+
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.last_t = None
+
+        self.boxes = np.zeros((0, 4), np.float32)
+        self.vel = np.zeros((0, 4), np.float32)
+        self.ids = np.zeros((0,), np.int64)
+        self.cls = np.zeros((0,), np.int32)
+        self.hits = np.zeros((0,), np.int32)
+        self.first_seen = np.zeros((0,), np.float64)
+        self.last_seen = np.zeros((0,), np.float64)
+
+        # (thời điểm xác nhận, class) và (thời điểm rời, dwell giây, class)
+        self.confirmed = deque()
+        self.finished = deque()
+
+    # ================= MATCHING =================
+
+    def _match(self, pred, dets):
+        """Ghép tham lam theo IoU giảm dần. Trả về (idx_track, idx_det) đã khớp."""
+        iou = iou_matrix(pred, dets)
+        if iou.size == 0:
+            return np.zeros((0,), np.int64), np.zeros((0,), np.int64)
+
+        order = np.argsort(-iou, axis=None)
+        rows, cols = np.unravel_index(order, iou.shape)
+        keep = iou[rows, cols] >= self.iou_threshold
+        rows, cols = rows[keep], cols[keep]
+
+        used_t = np.zeros(len(pred), bool)
+        used_d = np.zeros(len(dets), bool)
+        mt, md = [], []
+        for r, c in zip(rows, cols):
+            if used_t[r] or used_d[c]:
+                continue
+            used_t[r] = used_d[c] = True
+            mt.append(r)
+            md.append(c)
+
+        return np.asarray(mt, np.int64), np.asarray(md, np.int64)
+
+    def _match_centroid(self, pred, dets, mt, md, dt):
+        """
+        Ghép tham lam theo khoảng cách tâm cho track / box chưa khớp IoU.
+        Trả về (mt, md) đã nối thêm các cặp mới.
+        """
+        free_t = np.setdiff1d(np.arange(len(pred)), mt)
+        free_d = np.setdiff1d(np.arange(len(dets)), md)
+        if len(free_t) == 0 or len(free_d) == 0 or dt <= 0:
+            return mt, md
+
+        a, b = pred[free_t], dets[free_d]
+        ca = (a[:, :2] + a[:, 2:]) / 2
+        cb = (b[:, :2] + b[:, 2:]) / 2
+        dist = np.hypot(ca[:, None, 0] - cb[None, :, 0], ca[:, None, 1] - cb[None, :, 1])
+
+        area_a = np.maximum((a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1]), 1e-6)
+        area_b = np.maximum((b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]), 1e-6)
+        ratio = area_a[:, None] / area_b[None, :]
+        ok = (dist <= self.max_speed * dt) & (ratio <= self.max_size_ratio) & \
+             (ratio >= 1.0 / self.max_size_ratio)
+
+        order = np.argsort(dist, axis=None)
+        rows, cols = np.unravel_index(order, dist.shape)
+        keep = ok[rows, cols]
+        rows, cols = rows[keep], cols[keep]
+
+        used_t = np.zeros(len(free_t), bool)
+        used_d = np.zeros(len(free_d), bool)
+        mt, md = list(mt), list(md)
+        for r, c in zip(rows, cols):
+            if used_t[r] or used_d[c]:
+                continue
+            used_t[r] = used_d[c] = True
+            mt.append(free_t[r])
+            md.append(free_d[c])
+
+        return np.asarray(mt, np.int64), np.asarray(md, np.int64)
+
+    # ================= UPDATE =================
+
+    def update(self, det, t=None):
+        """
+        det: DetectionResult (xyxy / cls). t: thời điểm chụp (mặc định det.timestamp).
+        Trả về mảng ID track tương ứng từng box của det (-1 nếu chưa gán).
+        """
+        t = det.timestamp if t is None else t
+        boxes = det.xyxy
+        classes = det.cls
+
+        with self.lock:
+            dt = 0.0 if self.last_t is None else max(t - self.last_t, 1e-3)
+            self.last_t = t
+
+            # 1️⃣ Dự đoán vị trí theo vận tốc
+            pred = self.boxes + self.vel * dt
+
+            # 2️⃣ Ghép track <-> box
+            mt, md = self._match(pred, boxes)
+            mt, md = self._match_centroid(pred, boxes, mt, md, dt)
+
+            # 3️⃣ Cập nhật track đã khớp (alpha-beta)
+            if len(mt):
+                residual = boxes[md] - pred[mt]
+                # track mới (1 lần thấy, vận tốc 0): lấy thẳng vị trí / vận tốc đo được
+                first = (self.hits[mt] == 1)[:, None]
+                self.boxes[mt] = pred[mt] + np.where(first, 1.0, self.alpha) * residual
+                if dt > 0:
+                    self.vel[mt] = self.vel[mt] + np.where(first, 1.0, self.beta) * residual / dt
+                self.cls[mt] = classes[md]
+                self.hits[mt] += 1
+                self.last_seen[mt] = t
+
+                newly = mt[self.hits[mt] == self.min_hits]
+                for k in self.cls[newly]:
+                    self.confirmed.append((t, int(k)))
+
+            unmatched_t = np.ones(len(self.boxes), bool)
+            unmatched_t[mt] = False
+            self.boxes[unmatched_t] = pred[unmatched_t]
+
+            # 4️⃣ Box chưa khớp -> track mới
+            unmatched_d = np.ones(len(boxes), bool)
+            unmatched_d[md] = False
+            n_new = int(unmatched_d.sum())
+
+            out_ids = np.full(len(boxes), -1, np.int64)
+            out_ids[md] = self.ids[mt]
+
+            if n_new:
+                new_ids = np.arange(self.next_id, self.next_id + n_new)
+                self.next_id += n_new
+                out_ids[unmatched_d] = new_ids
+
+                self.boxes = np.vstack([self.boxes, boxes[unmatched_d]])
+                self.vel = np.vstack([self.vel, np.zeros((n_new, 4), np.float32)])
+                self.ids = np.concatenate([self.ids, new_ids])
+                self.cls = np.concatenate([self.cls, classes[unmatched_d]])
+                self.hits = np.concatenate([self.hits, np.ones(n_new, np.int32)])
+                self.first_seen = np.concatenate([self.first_seen, np.full(n_new, t)])
+                self.last_seen = np.concatenate([self.last_seen, np.full(n_new, t)])
+
+                if self.min_hits <= 1:
+                    for k in classes[unmatched_d]:
+                        self.confirmed.append((t, int(k)))
+
+            # 5️⃣ Xoá track mất dấu quá lâu, ghi lại dwell time
+            dead = (t - self.last_seen) > self.max_age
+            if dead.any():
+                done = dead & (self.hits >= self.min_hits)
+                for dwell, k in zip(self.last_seen[done] - self.first_seen[done], self.cls[done]):
+                    self.finished.append((t, float(dwell), int(k)))
+
+                alive = ~dead
+                self.boxes = self.boxes[alive]
+                self.vel = self.vel[alive]
+                self.ids = self.ids[alive]
+                self.cls = self.cls[alive]
+                self.hits = self.hits[alive]
+                self.first_seen = self.first_seen[alive]
+                self.last_seen = self.last_seen[alive]
+
+            self._trim(t)
+            return out_ids
+
+    def _trim(self, now):
+        limit = now - self.history
+        while self.confirmed and self.confirmed[0][0] < limit:
+            self.confirmed.popleft()
+        while self.finished and self.finished[0][0] < limit:
+            self.finished.popleft()
+
+    # ================= STATS =================
+
+    def stats(self, interval=60.0, now=None):
+        """
+        unique_vehicles: số xe khác nhau (theo class) được xác nhận trong `interval` giây
+        queue_length:    số xe đang thấy và gần như đứng yên
+        dwell_*:         thời gian xe ở trong khung hình (giây)
+        """
+        with self.lock:
+            now = (self.last_t or time.time()) if now is None else now
+            since = now - interval
+            num_classes = len(self.class_names)
+
+            unique = [0] * num_classes
+            for t, k in self.confirmed:
+                if t >= since and 0 <= k < num_classes:
+                    unique[k] += 1
+
+            confirmed = self.hits >= self.min_hits
+            visible = confirmed & (self.last_seen >= now - 1e-6)
+            centre_vel = np.stack([
+                (self.vel[:, 0] + self.vel[:, 2]) / 2,
+                (self.vel[:, 1] + self.vel[:, 3]) / 2
+            ], axis=1) if len(self.vel) else np.zeros((0, 2), np.float32)
+            speed = np.hypot(centre_vel[:, 0], centre_vel[:, 1])
+            queue = int((visible & (speed < self.stop_speed)).sum())
+
+            active_dwell = (self.last_seen - self.first_seen)[confirmed]
+            done = [d for t, d, _ in self.finished if t >= since]
+
+            return {
+                "interval_s": interval,
+                "unique_vehicles": unique,
+                "unique_total": sum(unique),
+                "active_tracks": int(confirmed.sum()),
+                "queue_length": queue,
+                "dwell_avg_s": round(float(np.mean(done)), 1) if done else None,
+                "dwell_max_active_s": round(float(active_dwell.max()), 1) if len(active_dwell) else None
+            }
@@ -4,63 +4,86 @@ import uuid
 import time
 import json
 
+from detection_result import DetectionResult
+
 
 class Yolo_AI:
-    def __init__(self, model_obj, class_names):
+    def __init__(self, model_obj, class_names, backend="torch"):
+        # model_obj: YOLO của Ultralytics (PyTorch / ONNX / NCNN, xem model_backend.py)
         self.model = model_obj
         self.class_names = class_names
+        self.backend = backend
 
-    def detect(self, processed_frame, brightness_val):
+    def infer(self, processed_frame, brightness_val, meta=None):
         """
-        processed_frame: Ảnh 640x640 đã qua xử lý (ROI / SCI / Gamma...)
-        brightness_val: giá trị độ sáng đã tính trước đó
+        Chạy YOLO, trả về DetectionResult (mảng xyxy / conf / cls + counts + timing).
+        meta (Tienxulyanh.process_with_meta): quy box về toạ độ frame gốc.
+        Lỗi model được raise cho caller xử lý.
         """
+        t0 = time.perf_counter()
+        results = self.model(processed_frame, conf=0.5, verbose=False)
 
-        try:
-            # ================= 1️⃣ Chạy YOLO =================
-            results = self.model(processed_frame, conf=0.5)
+        if not results or len(results) == 0:
+            raise RuntimeError("No detection results")
 
-            if not results or len(results) == 0:
-                return {"error": "No detection results"}, 0
+        det = DetectionResult.from_ultralytics(results[0], self.class_names,
+                                               brightness=brightness_val, image=processed_frame)
+        if meta is not None:
+            det.map_to_source(meta)
+        det.timing["total"] = (time.perf_counter() - t0) * 1000.0
+        return det
 
-            img_out = results[0].plot()
+    def detect_batch(self, processed_frames, brightness_vals):
+        """
+        Chạy YOLO 1 lần cho cả batch ảnh (cùng kích thước, vd. nhiều camera).
+        Trả về list (res, total) theo đúng thứ tự đầu vào, không kèm ảnh.
+        """
+        if not processed_frames:
+            return []
 
-            # ================= 2️⃣ Đếm số lượng theo class =================
-            num_classes = len(self.class_names)
-            counts = [0] * num_classes
+        try:
+            results = self.model(list(processed_frames), conf=0.5, verbose=False)
+        except Exception as e:
+            print(f"--- Lỗi Yolo_AI.detect_batch(): {e} ---")
+            return [({"error": str(e)}, 0) for _ in processed_frames]
 
-            boxes = results[0].boxes
+        out = []
+        for result, brightness_val in zip(results, brightness_vals):
+            det = DetectionResult.from_ultralytics(result, self.class_names,
+                                                   brightness=brightness_val)
+            out.append((det.to_dict(), det.total))
 
-            if boxes is not None and hasattr(boxes, 'cls'):
-                try:
-                    cls_list = [int(x) for x in boxes.cls]
-                except Exception:
-                    cls_list = []
+        return out
 
-                for idx in cls_list:
-                    if 0 <= idx < num_classes:
-                        counts[idx] += 1
+    def detect_raw(self, processed_frame, brightness_val, meta=None):
+        """
+        Như detect() nhưng KHÔNG vẽ / encode ảnh.
+        Trả về (res, total, det) với det là DetectionResult để vẽ / phân tích sau.
+        """
 
-            total = sum(counts)
+        try:
+            det = self.infer(processed_frame, brightness_val, meta=meta)
+            return det.to_dict(), det.total, det
 
-            # ================= 3️⃣ Đóng gói kết quả (base64 image)
-            res = {
-                "counts": counts,
-                "total_vehicles": total,
-                "brightness": round(brightness_val, 2),
-                "timestamp": int(time.time())
-            }
+        except Exception as e:
+            print(f"--- Lỗi Yolo_AI.detect(): {e} ---")
+            return {"error": str(e)}, 0, None
+
+    def detect(self, processed_frame, brightness_val, render=True):
+        """
+        processed_frame: Ảnh 640x640 đã qua xử lý (ROI / SCI / Gamma...)
+        brightness_val: giá trị độ sáng đã tính trước đó
+        render: vẽ box + encode base64 vào res['processed_image']
+        """
+        res, total, det = self.detect_raw(processed_frame, brightness_val)
 
+        if render and det is not None:
             try:
                 import base64
-                _, buf = cv2.imencode('.jpg', img_out)
+                _, buf = cv2.imencode('.jpg', det.draw())
                 b64 = base64.b64encode(buf).decode('utf-8')
                 res['processed_image'] = f"data:image/jpeg;base64,{b64}"
             except Exception:
                 pass
 
-            return res, total
-
-        except Exception as e:
-            print(f"--- Lỗi Yolo_AI.detect(): {e} ---")
-            return {"error": str(e)}, 0
\ No newline at end of file
+        return res, total